@@ -0,0 +1,193 @@
+import glob
+import json
+import logging
+import os
+import re
+import threading
+from collections import deque
+from typing import Deque, List, MutableMapping, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+RECORD = "record"
+REPLAY = "replay"
+OFF = "off"
+
+UUID_PATTERN = re.compile(r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}")
+TIMESTAMP_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d+)?(Z|[+-]\d{2}:?\d{2})?")
+
+# Only these response headers are needed by the client; the rest (dates, request ids, ...) change on every request
+RECORDED_HEADERS = ("Content-Type",)
+
+
+class CassetteMiss(requests.exceptions.ConnectionError):
+    """
+    Raised in replay mode for a request that is not in the cassette
+    """
+
+
+class Cassette(object):
+    """
+    Records the requests made by `VinylDNSClient` along with the responses from the API, and replays them without a
+    backend.
+
+    Requests are matched on their method, path, query and body; signatures and other headers are ignored.  Because
+    tests generate some values themselves, requests are normalized before they are matched:
+      - timestamps are replaced with a placeholder
+      - ids the API has not returned yet (i.e. generated by the client, like random zone names) are replaced with a
+        placeholder; ids the API did return are kept, as they are served again on replay
+    When a replayed request contained a client-generated id, the recorded id is substituted for it in later requests,
+    so a test that keeps using its own id still matches the recorded conversation.
+
+    Identical requests (e.g. polling) are answered in the order they were recorded; once the recorded answers run out,
+    the last one is repeated.
+    """
+
+    def __init__(self, path: str, mode: str):
+        """
+        :param path: the cassette directory; each xdist worker records to its own file in it, and replay loads them all
+        :param mode: `record` or `replay`
+        """
+        self.path = path
+        self.mode = mode
+        self.lock = threading.Lock()
+        self.interactions: List[dict] = []
+        self.recordings: MutableMapping[str, Deque[dict]] = {}
+        self.seen_ids: Set[str] = set()
+        self.aliases: MutableMapping[str, str] = {}
+
+        if mode == REPLAY:
+            self.load()
+
+    def adapter(self, adapter: HTTPAdapter) -> HTTPAdapter:
+        """
+        Wraps a session's adapter so requests made through it go through the cassette
+        """
+        return CassetteAdapter(self, adapter)
+
+    def normalize(self, request: requests.PreparedRequest) -> Tuple[str, List[str]]:
+        """
+        Builds the key a request is matched on
+        :return: the key, and the client-generated ids that were replaced with placeholders in it
+        """
+        split = urlsplit(request.url)
+        query = urlencode(sorted(parse_qsl(split.query, keep_blank_values=True)))
+        body = request.body or ""
+        if isinstance(body, bytes):
+            body = body.decode("utf-8", "replace")
+        try:
+            body = json.dumps(json.loads(body), sort_keys=True)
+        except ValueError:
+            pass
+
+        text = "{0} {1}?{2}\n{3}".format(request.method, split.path, query, body)
+        for alias, recorded in self.aliases.items():
+            text = text.replace(alias, recorded)
+        text = TIMESTAMP_PATTERN.sub("<timestamp>", text)
+
+        generated = []
+
+        def replace_generated(match):
+            if match.group(0) in self.seen_ids:
+                return match.group(0)
+            generated.append(match.group(0))
+            return "<id>"
+
+        return UUID_PATTERN.sub(replace_generated, text), generated
+
+    def remember_ids(self, body: str) -> None:
+        self.seen_ids.update(UUID_PATTERN.findall(body))
+
+    def record(self, request: requests.PreparedRequest, response: requests.Response) -> None:
+        with self.lock:
+            key, generated = self.normalize(request)
+            self.interactions.append({
+                "request": key,
+                "generated": generated,
+                "response": {
+                    "status": response.status_code,
+                    "headers": dict((h, response.headers[h]) for h in RECORDED_HEADERS if h in response.headers),
+                    "body": response.text
+                }
+            })
+            self.remember_ids(response.text)
+
+    def replay(self, request: requests.PreparedRequest, adapter: HTTPAdapter) -> requests.Response:
+        with self.lock:
+            key, generated = self.normalize(request)
+            recordings = self.recordings.get(key)
+            if not recordings:
+                raise CassetteMiss("No recorded response for " + key.replace("\n", " "), request=request)
+
+            interaction = recordings.popleft() if len(recordings) > 1 else recordings[0]
+            for live, recorded in zip(generated, interaction["generated"]):
+                if live != recorded:
+                    self.aliases[live] = recorded
+            self.remember_ids(interaction["response"]["body"])
+
+        recorded_response = interaction["response"]
+        response = requests.Response()
+        response.status_code = recorded_response["status"]
+        response.headers = CaseInsensitiveDict(recorded_response["headers"])
+        response._content = recorded_response["body"].encode("utf-8")
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        response.connection = adapter
+        return response
+
+    def worker_file(self, worker_id: str) -> str:
+        return os.path.join(self.path, "{0}.json".format(worker_id))
+
+    def load(self) -> None:
+        files = sorted(glob.glob(os.path.join(self.path, "*.json")))
+        if not files:
+            logger.warning("No recordings found in cassette %s", self.path)
+        for cassette_file in files:
+            with open(cassette_file) as f:
+                for interaction in json.load(f)["interactions"]:
+                    self.recordings.setdefault(interaction["request"], deque()).append(interaction)
+
+    def clear(self) -> None:
+        """
+        Removes the recordings of a previous session before recording a new one
+        """
+        for cassette_file in glob.glob(os.path.join(self.path, "*.json")):
+            os.remove(cassette_file)
+
+    def save(self, worker_id: str) -> None:
+        if self.mode != RECORD or not self.interactions:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        with self.lock, open(self.worker_file(worker_id), "w") as f:
+            json.dump({"interactions": self.interactions}, f, indent=1)
+
+
+class CassetteAdapter(HTTPAdapter):
+    """
+    A transport adapter that records the responses of the adapter it wraps, or, in replay mode, answers from the
+    cassette without sending anything
+    """
+
+    def __init__(self, cassette: Cassette, adapter: HTTPAdapter):
+        super().__init__()
+        self.cassette = cassette
+        self.adapter = adapter
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        if self.cassette.mode == REPLAY:
+            return self.cassette.replay(request, self)
+
+        response = self.adapter.send(request, stream=stream, timeout=timeout, verify=verify, cert=cert,
+                                     proxies=proxies)
+        self.cassette.record(request, response)
+        return response
+
+    def close(self):
+        self.adapter.close()
+        super().close()
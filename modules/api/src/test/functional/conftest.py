@@ -5,13 +5,19 @@ import ssl
 import sys
 import traceback
 from collections import OrderedDict
-from typing import MutableMapping, List
+from typing import MutableMapping, List, Tuple
+from xml.etree import ElementTree
 
 import _pytest.config
 import pytest
+from _pytest.junitxml import mangle_test_address
 from xdist.scheduler import LoadScopeScheduling
 
+from cassette import Cassette, OFF, RECORD, REPLAY
+from profiler import ProfilerPlugin
+from utils import dns_answer_cache
 from vinyldns_context import VinylDNSTestContext
+from vinyldns_python import VinylDNSClient
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(
@@ -46,6 +52,29 @@ def pytest_addoption(parser: _pytest.config.argparsing.Parser) -> None:
     parser.addoption("--enable-safety_check", dest="enable_safety_check", action="store_true",
                      help="If provided, enable object mutation safety checks; otherwise safety checks are disable. "
                           "This is a handy development tool to catch rogue tests mutating data which can affect other tests.")
+    parser.addoption("--partition-pool", dest="partition_pool", action="store_true",
+                     help="If provided, workers lease shared test partitions from a pool that persists between runs; "
+                          "partitions are reset and kept on return instead of being torn down.")
+    parser.addoption("--partitions", dest="partitions", action="store", default="4",
+                     help="The number of test partitions configured in the DNS server (partition1..N)")
+    parser.addoption("--partition-lease-timeout", dest="partition_lease_timeout", action="store", default="600",
+                     help="Seconds a worker waits for a free partition when using `--partition-pool`")
+    parser.addoption("--resource-lock-timeout", dest="resource_lock_timeout", action="store", default="600",
+                     help="Seconds a test waits for the resources named by its `resource_lock` marks")
+    parser.addoption("--profile-tests", dest="profile_tests", action="store_true",
+                     help="If provided, break the time of each test down into http, signing, polling, dns and local "
+                          "time, and write a report and a collapsed-stack file for flame graphs to `--profile-dir`")
+    parser.addoption("--profile-dir", dest="profile_dir", action="store", default="../target/pytest_profile",
+                     help="The directory the `--profile-tests` report is written to")
+    parser.addoption("--cassette", dest="cassette", action="store", default="../target/cassette",
+                     help="The directory API requests are recorded to or replayed from with `--cassette-mode`")
+    parser.addoption("--cassette-mode", dest="cassette_mode", action="store", default=OFF,
+                     choices=[OFF, RECORD, REPLAY],
+                     help="`record` to save every API request and response to `--cassette`; `replay` to answer "
+                          "requests from it in-process instead of calling the API")
+    parser.addoption("--dns-cache", dest="enable_dns_cache", action="store_true",
+                     help="If provided, cache dns answers for their TTL (or the SOA negative caching TTL) so repeated "
+                          "lookups while polling do not re-query the name server.")
 
 
 def pytest_configure(config: _pytest.config.Config) -> None:
@@ -64,10 +93,18 @@ def pytest_configure(config: _pytest.config.Config) -> None:
     if not url.endswith("/"):
         url += "/"
 
+    # a worker holds its partition for the whole session, so workers beyond the pool would only wait for a lease
+    workers = getattr(config.option, "numprocesses", None)
+    if config.getoption("partition_pool") and isinstance(workers, int) and workers > int(config.getoption("partitions")):
+        raise pytest.UsageError("--partition-pool needs a partition per worker: -n {0} is more than --partitions {1}"
+                                .format(workers, config.getoption("partitions")))
+
     # Define markers
     config.addinivalue_line("markers", "serial")
     config.addinivalue_line("markers", "skip_production")
     config.addinivalue_line("markers", "manual_batch_review")
+    config.addinivalue_line("markers", "resource_lock(*names): hold cross-worker exclusive locks on the named "
+                                       "resources while the test runs, e.g. `processing_status`")
 
     name_server_ip = retrieve_resolver(config.getoption("dns_ip"))
     VinylDNSTestContext.configure(name_server_ip=name_server_ip,
@@ -78,7 +115,29 @@ def pytest_configure(config: _pytest.config.Config) -> None:
                                   url=url,
                                   teardown=config.getoption("teardown").lower() == "true",
                                   key_algo=config.getoption("dns_key_algo"),
-                                  enable_safety_check=config.getoption("enable_safety_check"))
+                                  enable_safety_check=config.getoption("enable_safety_check"),
+                                  enable_dns_cache=config.getoption("enable_dns_cache"))
+
+    if config.getoption("enable_dns_cache"):
+        VinylDNSClient.dns_cache = dns_answer_cache
+
+    if config.getoption("cassette_mode") != OFF:
+        VinylDNSClient.cassette = Cassette(config.getoption("cassette"), config.getoption("cassette_mode"))
+        if VinylDNSClient.cassette.mode == RECORD and not hasattr(config, "workerinput"):
+            VinylDNSClient.cassette.clear()
+
+    if config.getoption("profile_tests"):
+        config.pluginmanager.register(ProfilerPlugin(config, config.getoption("profile_dir")), "vinyldns_profiler")
+
+
+def pytest_unconfigure(config: _pytest.config.Config) -> None:
+    """
+    Saves the requests recorded by this process when recording a cassette
+    """
+    if VinylDNSClient.cassette is not None:
+        VinylDNSClient.cassette.save(config.workerinput["workerid"] if hasattr(config, "workerinput") else "master")
+        VinylDNSClient.cassette = None
+    VinylDNSClient.dns_cache = None
 
 
 def pytest_report_header(config: _pytest.config.Config) -> str:
@@ -120,23 +179,104 @@ def retrieve_resolver(resolver_name: str) -> str:
 
     return resolver_address
 
-class WorkerScheduler(LoadScopeScheduling):
+def load_test_durations(junit_path: str) -> MutableMapping[Tuple[str, str], float]:
+    """
+    Reads how long each test took from the junit report of a previous run
+    :param junit_path: the path of the junit xml report
+    :return: a dict of (classname, name) junit addresses to the duration in seconds; empty if there is no report
+    """
+    durations = {}
+    if not junit_path or not os.path.exists(junit_path):
+        return durations
+
+    try:
+        for _, element in ElementTree.iterparse(junit_path):
+            if element.tag == "testcase":
+                durations[(element.get("classname"), element.get("name"))] = float(element.get("time") or 0)
+                element.clear()
+    except (ElementTree.ParseError, ValueError):
+        logger.warning("Ignoring unreadable junit report %s", junit_path)
+
+    return durations
+
+
+class DurationAwareScheduler(LoadScopeScheduling):
+    """
+    Hands out the longest tests first, based on the durations in the junit report written by the previous run, so
+    that short tests fill in at the end and workers finish at about the same time (longest-processing-time-first).
+    Tests without a recorded duration are assumed to take as long as the average test in their module.
+
+    Tests matching `worker_assignments` only ever run on their assigned worker, in collection order.
+    """
     worker_assignments: List[MutableMapping] = [{"name": "list_batch_change_summaries_test.py", "worker": 0}]
 
+    def __init__(self, config, log=None):
+        super().__init__(config, log)
+        self.durations = load_test_durations(config.option.xmlpath)
+        self.ordered = False
+
+    def _affinity(self, scope):
+        for assignment in DurationAwareScheduler.worker_assignments:
+            if assignment["name"] in scope:
+                return "gw{0}".format(assignment["worker"])
+        return None
+
+    def _expected_duration(self, nodeid, module_averages):
+        names = mangle_test_address(nodeid)
+        known = self.durations.get((".".join(names[:-1]), names[-1]))
+        return known if known is not None else module_averages.get(".".join(names[:-1]), 0)
+
+    def _order_workqueue(self):
+        """
+        Sorts the work queue longest first, keeping pinned work in collection order ahead of everything else
+        """
+        totals = {}
+        for (classname, _), duration in self.durations.items():
+            total, count = totals.get(classname, (0, 0))
+            totals[classname] = (total + duration, count + 1)
+        module_averages = dict((k, total / count) for k, (total, count) in totals.items())
+
+        expected = dict((scope, sum(self._expected_duration(nodeid, module_averages) for nodeid in work_unit))
+                        for scope, work_unit in self.workqueue.items())
+        ordered = sorted(self.workqueue.items(),
+                         key=lambda item: (self._affinity(item[0]) is None, -expected[item[0]]))
+        self.workqueue = OrderedDict(ordered)
+        self.ordered = True
+
     def _assign_work_unit(self, node):
-        """Assign a work unit to a node."""
-        assert self.workqueue
+        """
+        Assigns the longest unit of work the node is allowed to run, preferring work pinned to the node
+        """
+        if not self.ordered:
+            self._order_workqueue()
+
+        # pinned work is at the front of the queue, so a node reaches its own pinned work before anything else
+        worker_ids = set(n.gateway.id for n in self.nodes)
+        selected = None
+        for scope in self.workqueue:
+            affinity = self._affinity(scope)
+            if affinity is None or affinity == node.gateway.id or affinity not in worker_ids:
+                selected = scope
+                break
+
+        if selected is None:
+            # only work pinned to other workers is left
+            return
+
+        self.run_work_on_node(node, selected, self.workqueue.pop(selected))
+
+    def _reschedule(self, node):
+        if node.shutting_down:
+            return
 
-        # Grab a unit of work
-        scope, work_unit = self.workqueue.popitem(last=False)
+        if not self.workqueue:
+            node.shutdown()
+            return
 
-        # Always run list_batch_change_summaries_test on the first worker
-        for assignment in WorkerScheduler.worker_assignments:
-            while assignment["name"] in scope:
-                self.run_work_on_node(self.nodes[assignment["worker"]], scope, work_unit)
-                scope, work_unit = self.workqueue.popitem(last=False)
+        if self._pending_of(self.assigned_work[node]) > 2:
+            return
 
-        self.run_work_on_node(node, scope, work_unit)
+        self._assign_work_unit(node)
 
     def run_work_on_node(self, node, scope, work_unit):
         # Keep track of the assigned work
@@ -156,4 +296,4 @@ class WorkerScheduler(LoadScopeScheduling):
 
 
 def pytest_xdist_make_scheduler(config, log):
-    return WorkerScheduler(config, log)
+    return DurationAwareScheduler(config, log)
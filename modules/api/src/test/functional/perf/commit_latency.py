@@ -0,0 +1,220 @@
+"""
+Measures how long a change takes from submission until name servers answer with it.
+
+Changes (single recordset creates, batch changes, or both) are submitted at a target rate across N zones on an open-loop
+schedule, see `workload.open_loop`.  Each change is then followed through its stages:
+
+- `accepted`: the API answered the submission with 202
+- `status <S>`: the change was first seen with status S, by polling the change every --poll-interval
+- `complete`: the change reached Complete (or Failed, reported as `failed`)
+- `dns`: the first name server answered with the new record, when --name-server is given
+
+Each stage is reported as a distribution of the time since the change was scheduled, and `accepted -> complete` and
+`complete -> dns` as the time between stages.  Status times are only as precise as the poll interval.
+
+Run it with `python -m perf.commit_latency --url http://localhost:9000 --rate 20 --zones 8`.  To include the dns stage,
+create the zones under a domain the API's backend serves (--zone-suffix) and give the name servers to query.
+"""
+import argparse
+import logging
+import math
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, MutableMapping, Optional
+
+from perf import results, workload
+from perf.histogram import LatencyHistogram, format_summaries
+from perf.workload import Tenant
+from utils import create_recordset, get_change_A_AAAA_json, wait_until_dns_answer
+
+logger = logging.getLogger(__name__)
+
+RECORDSET = "recordset"
+BATCH = "batch"
+KINDS = (RECORDSET, BATCH)
+
+# the statuses after which a change is not polled any more
+FINAL_STATUSES = {"Complete", "Failed", "PartialFailure"}
+
+
+class CommitLatency(object):
+    """
+    Submits changes on schedule and follows each one until it is visible
+    """
+
+    def __init__(self, tenants: List[Tenant], kinds: List[str], rate: float, duration: float,
+                 name_servers: Optional[List[str]] = None, poll_interval: float = 0.05, change_timeout: float = 120.0,
+                 batch_size: int = 1, max_workers: int = 256, seed: Optional[int] = None):
+        """
+        :param tenants: the tenants whose zones the changes are made in
+        :param kinds: the kinds of change to submit, used in turn
+        :param rate: changes submitted per second
+        :param duration: the number of seconds to submit changes for
+        :param name_servers: the name servers to wait for an answer from, in `host[:port]` format; none to skip the
+        dns stage
+        :param poll_interval: seconds between polls of the status of a change
+        :param change_timeout: seconds to follow a change for before giving up on it
+        :param batch_size: the number of changes in each batch change
+        :param max_workers: the number of threads following changes
+        :param seed: seeds the schedule and the choice of zones
+        """
+        self.zones = [(tenant, zone) for tenant in tenants for zone in tenant.zones]
+        self.kinds = kinds
+        self.rate = rate
+        self.duration = duration
+        self.name_servers = name_servers
+        self.poll_interval = poll_interval
+        self.change_timeout = change_timeout
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.rng = random.Random(seed)
+        self.histograms: MutableMapping[str, LatencyHistogram] = {}
+        self.outcomes: MutableMapping[str, int] = {}
+        self.lock = threading.Lock()
+
+    def record(self, kind: str, stage: str, seconds: float) -> None:
+        with self.lock:
+            histogram = self.histograms.setdefault("{0}/{1}".format(kind, stage), LatencyHistogram())
+        histogram.record(seconds)
+
+    def count(self, kind: str, outcome: str) -> None:
+        with self.lock:
+            key = "{0} {1}".format(kind, outcome)
+            self.outcomes[key] = self.outcomes.get(key, 0) + 1
+
+    def submit_recordset(self, tenant: Tenant, zone: dict, record_name: str, address: str) -> dict:
+        return tenant.client.create_recordset(create_recordset(zone, record_name, "A", [{"address": address}]))
+
+    def submit_batch(self, tenant: Tenant, zone: dict, record_name: str, address: str) -> dict:
+        changes = [get_change_A_AAAA_json("{0}.{1}".format(record_name, zone["name"]), address=address)]
+        changes += [get_change_A_AAAA_json("{0}-{1}.{2}".format(record_name, i, zone["name"]), address=address)
+                    for i in range(1, self.batch_size)]
+        return tenant.client.create_batch_change({"comments": "commit latency", "changes": changes},
+                                                 allow_manual_review=False)
+
+    def poll(self, kind: str, tenant: Tenant, change: dict) -> dict:
+        if kind == RECORDSET:
+            return tenant.client.get_recordset_change(change["recordSet"]["zoneId"], change["recordSet"]["id"],
+                                                      change["id"])
+        return tenant.client.get_batch_change(change["id"])
+
+    def follow(self, kind: str, tenant: Tenant, zone: dict, scheduled: float) -> None:
+        """
+        Submits one change and records the time each of its stages was reached
+        """
+        record_name = "commit-" + uuid.uuid4().hex[:12]
+        address = "10.3.{0}.{1}".format(self.rng.randint(0, 255), self.rng.randint(1, 254))
+        submit = self.submit_recordset if kind == RECORDSET else self.submit_batch
+        workload.last_status()
+        try:
+            change = submit(tenant, zone, record_name, address)
+        except Exception as e:
+            self.count(kind, "submit {0}".format(type(e).__name__))
+            return
+        accepted = time.perf_counter()
+        status = workload.last_status()
+        if status != 202:
+            self.count(kind, "rejected {0}".format(status))
+            return
+        self.record(kind, "accepted", accepted - scheduled)
+
+        seen = {change["status"]}
+        self.record(kind, "status {0}".format(change["status"]), accepted - scheduled)
+        deadline = accepted + self.change_timeout
+        while change["status"] not in FINAL_STATUSES:
+            if time.perf_counter() > deadline:
+                self.count(kind, "timed out in {0}".format(change["status"]))
+                return
+            time.sleep(self.poll_interval)
+            latest = self.poll(kind, tenant, change)
+            if isinstance(latest, dict) and "status" in latest:
+                change = latest
+                if change["status"] not in seen:
+                    seen.add(change["status"])
+                    self.record(kind, "status {0}".format(change["status"]), time.perf_counter() - scheduled)
+        completed = time.perf_counter()
+
+        if change["status"] != "Complete":
+            self.count(kind, change["status"].lower())
+            self.record(kind, "failed", completed - scheduled)
+            return
+        self.record(kind, "complete", completed - scheduled)
+        self.record(kind, "accepted -> complete", completed - accepted)
+
+        if self.name_servers:
+            try:
+                visible_after = wait_until_dns_answer(zone, record_name, "A", [address],
+                                                      timeout=self.change_timeout, name_servers=self.name_servers)
+            except AssertionError:
+                self.count(kind, "not visible in dns")
+                return
+            visible = completed + min(visible_after.values())
+            self.record(kind, "dns", visible - scheduled)
+            self.record(kind, "complete -> dns", visible - completed)
+        self.count(kind, "complete")
+
+    def run(self) -> None:
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="commit") as executor:
+            for index, (scheduled, _) in enumerate(workload.open_loop(self.rate, self.duration, self.rng)):
+                tenant, zone = self.rng.choice(self.zones)
+                executor.submit(self.follow, self.kinds[index % len(self.kinds)], tenant, zone, scheduled)
+
+    def format_report(self) -> str:
+        lines = ["outcomes: " + ", ".join("{0} {1}".format(k, v) for k, v in sorted(self.outcomes.items())), "",
+                 "time since the change was scheduled, per stage (ms), polling every {0:g}ms:"
+                 .format(self.poll_interval * 1000),
+                 format_summaries(self.histograms, "change/stage")]
+        return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measures the time from submitting a change to it being visible")
+    parser.add_argument("--url", default="http://localhost:9000", help="The url of the API")
+    parser.add_argument("--rate", type=float, default=10.0, help="Changes submitted per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to submit changes for")
+    parser.add_argument("--kinds", type=lambda v: v.split(","), default=list(KINDS),
+                        help="Comma separated kinds of change to submit in turn: recordset, batch")
+    parser.add_argument("--zones", type=int, default=8, help="The number of zones to spread changes over")
+    parser.add_argument("--batch-size", type=int, default=1, help="The number of changes in each batch change")
+    parser.add_argument("--poll-interval", type=float, default=0.05, help="Seconds between polls of a change")
+    parser.add_argument("--change-timeout", type=float, default=120.0,
+                        help="Seconds to follow a change for before giving up on it")
+    parser.add_argument("--name-server", dest="name_servers", action="append",
+                        help="A name server in host[:port] format to wait for the record on; repeat for several")
+    parser.add_argument("--zone-suffix", default=workload.DEFAULT_ZONE_SUFFIX,
+                        help="The domain zones are created under; the real API needs its backend to serve them")
+    parser.add_argument("--workers", type=int, default=256, help="Threads following changes")
+    parser.add_argument("--seed", type=int, help="Seeds the schedule and the choice of zones")
+    results.add_arguments(parser)
+    args = parser.parse_args()
+    if set(args.kinds) - set(KINDS):
+        parser.error("--kinds must be some of {0}".format(", ".join(KINDS)))
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    users = workload.writable_users()
+    tenant_count = min(args.zones, len(users))
+    tenants = workload.provision(args.url, users[:tenant_count], math.ceil(args.zones / tenant_count),
+                                 zone_suffix=args.zone_suffix, pool_size=args.workers)
+    try:
+        # provisioning rounds up to whole zones per tenant; drop the extra ones from the end
+        extra = sum(len(t.zones) for t in tenants) - args.zones
+        for tenant in reversed(tenants):
+            while extra > 0 and tenant.zones:
+                tenant.zones.pop()
+                extra -= 1
+
+        benchmark = CommitLatency(tenants, args.kinds, args.rate, args.duration, args.name_servers,
+                                  args.poll_interval, args.change_timeout, args.batch_size, args.workers, args.seed)
+        benchmark.run()
+    finally:
+        workload.tear_down(tenants)
+
+    print(benchmark.format_report())
+    results.report("commit_latency", dict((name, h.summary()) for name, h in benchmark.histograms.items()), args)
+
+
+if __name__ == "__main__":
+    main()
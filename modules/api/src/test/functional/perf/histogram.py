@@ -0,0 +1,122 @@
+import math
+import threading
+from typing import Iterable, MutableMapping, Optional
+
+# Buckets grow by 1% per step, so any recorded value is reported to within 1% of what was measured
+PRECISION = 0.01
+# Values below a microsecond all land in the first bucket
+LOWEST = 1e-6
+
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+class LatencyHistogram(object):
+    """
+    A histogram of durations in seconds with buckets of fixed relative width, in the spirit of HdrHistogram: memory
+    grows with the range of values recorded, not with their number, so a run of millions of requests can keep every
+    sample, and histograms recorded separately (per operation, per worker or per run) can be merged exactly.
+    """
+
+    def __init__(self, buckets: Optional[MutableMapping[int, int]] = None):
+        self.buckets: MutableMapping[int, int] = dict(buckets or {})
+        self.count = sum(self.buckets.values())
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def bucket(seconds: float) -> int:
+        if seconds <= LOWEST:
+            return 0
+        return int(math.log(seconds / LOWEST) / math.log1p(PRECISION)) + 1
+
+    @staticmethod
+    def value(bucket: int) -> float:
+        """
+        :return: the upper bound of a bucket, the value reported for everything in it
+        """
+        return LOWEST * (1 + PRECISION) ** bucket
+
+    def record(self, seconds: float) -> None:
+        bucket = self.bucket(seconds)
+        with self.lock:
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+            self.count += 1
+            self.total += seconds
+            self.min = seconds if self.min is None else min(self.min, seconds)
+            self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def merge(self, other: "LatencyHistogram") -> "LatencyHistogram":
+        with self.lock:
+            for bucket, count in other.buckets.items():
+                self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+            self.count += other.count
+            self.total += other.total
+            if other.min is not None:
+                self.min = other.min if self.min is None else min(self.min, other.min)
+            if other.max is not None:
+                self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """
+        :param percentile: between 0 and 100
+        :return: the smallest recorded value that `percentile`% of the samples are at or below, or None if the
+        histogram is empty
+        """
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(self.count * percentile / 100.0))
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(self.value(bucket), self.max)
+        return self.max
+
+    def summary(self, percentiles: Iterable[float] = PERCENTILES) -> dict:
+        """
+        :return: the count, mean, min, max and percentiles (as `p50`, `p99.9`, ...) in seconds
+        """
+        result = {"count": self.count, "mean": self.mean, "min": self.min, "max": self.max}
+        for percentile in percentiles:
+            result["p{0:g}".format(percentile)] = self.percentile(percentile)
+        return result
+
+    def to_dict(self) -> dict:
+        """
+        :return: a json-serializable form of the histogram that `from_dict` reads back
+        """
+        return {"buckets": dict((str(b), c) for b, c in sorted(self.buckets.items())), "total": self.total,
+                "min": self.min, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, document: dict) -> "LatencyHistogram":
+        histogram = cls(dict((int(b), c) for b, c in document["buckets"].items()))
+        histogram.total = document["total"]
+        histogram.min = document["min"]
+        histogram.max = document["max"]
+        return histogram
+
+
+def format_summaries(histograms: MutableMapping[str, LatencyHistogram], title: str = "operation",
+                     percentiles: Iterable[float] = PERCENTILES) -> str:
+    """
+    Formats one row per histogram, sorted by name, with times in milliseconds
+    """
+    percentiles = list(percentiles)
+    width = max([len(title)] + [len(name) for name in histograms]) + 2
+    columns = ["count", "mean"] + ["p{0:g}".format(p) for p in percentiles] + ["max"]
+    lines = ["{0:<{1}}".format(title, width) + "".join("{0:>10}".format(c) for c in columns)]
+    for name in sorted(histograms):
+        summary = histograms[name].summary(percentiles)
+        cells = ["{0:>10}".format(summary["count"])]
+        cells += ["{0:>10.2f}".format(summary[c] * 1000) if summary[c] is not None else "{0:>10}".format("-")
+                  for c in columns[1:]]
+        lines.append("{0:<{1}}".format(name, width) + "".join(cells))
+    return "\n".join(lines) + "\n"
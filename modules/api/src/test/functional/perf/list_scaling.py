@@ -0,0 +1,197 @@
+"""
+Measures how the list endpoints scale with the amount of data behind them.
+
+Recordsets: zones are filled with 1k, 10k and 100k recordsets (by default) of a mix of types, named so that a name
+filter matches a tenth of them and a type filter a quarter.  Every page of each listing is fetched, unfiltered and with
+each filter, in both name sort orders.
+
+Zones: tenants and their zones are added in steps (by default 1 tenant with 10 zones, then 4 tenants, then every test
+user, then 50 zones each).  After each step the zones are listed as one tenant sees them, with `ignoreAccess` (every
+zone, so the access check has to skip the other tenants' zones), and with a name filter on that tenant's zones.
+
+The first, middle and last page of each listing are timed separately: an API that pages with offsets gets slower
+towards the end of a large listing, one that pages with keys does not.  Results are written as json (see
+`perf.results`) and can be compared against the results of an earlier run; the run fails when a page got slower than
+the baseline by more than the tolerance.
+
+Run it with `python -m perf.list_scaling --url http://localhost:9000 --output list_scaling.json`.
+"""
+import argparse
+import logging
+import time
+from typing import Callable, List, MutableMapping, Optional, Sequence, Tuple
+
+from perf import results, workload
+from perf.histogram import LatencyHistogram, format_summaries
+from perf.workload import Tenant
+from vinyldns_python import VinylDNSClient
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+
+# the recordset listings fetched in each zone: a name, and the filters that are passed to list_recordsets_by_zone
+SCENARIOS = [
+    ("all", {}),
+    ("name-filter", {"record_name_filter": "r3-*"}),
+    ("type-filter", {"record_type_filter": "AAAA"}),
+]
+NAME_SORTS = ("ASC", "DESC")
+POSITIONS = ("first", "middle", "last", "all")
+
+
+def default_zone_steps() -> List[Tuple[int, int]]:
+    users = len(workload.writable_users())
+    return [(1, 10), (4, 10), (users, 10), (users, 50)]
+
+
+def parse_zone_steps(value: str) -> List[Tuple[int, int]]:
+    """
+    Parses steps like `1x10,4x10` (tenants x zones per tenant); each step must have at least as many tenants and zones
+    as the one before, since steps only add data
+    """
+    steps = []
+    for part in value.split(","):
+        if not part:
+            continue
+        tenants, _, zones = part.partition("x")
+        steps.append((int(tenants), int(zones)))
+    for (tenants, zones), (next_tenants, next_zones) in zip(steps, steps[1:]):
+        if next_tenants < tenants or next_zones < zones:
+            raise argparse.ArgumentTypeError("zone steps must not shrink: {0}".format(value))
+    if steps and steps[-1][0] > len(workload.writable_users()):
+        raise argparse.ArgumentTypeError("there are only {0} test users to be tenants"
+                                         .format(len(workload.writable_users())))
+    return steps
+
+
+def record_name(index: int) -> str:
+    # the prefix puts every tenth recordset under the same name filter, spread across the whole zone
+    return "r{0}-{1}".format(index % 10, index)
+
+
+def list_all_pages(fetch: Callable[[Optional[str]], dict]) -> List[float]:
+    """
+    Fetches every page of a listing
+    :param fetch: fetches the page with the given start key
+    :return: the time each page took, in order
+    """
+    timings = []
+    start_from: Optional[str] = None
+    while True:
+        started = time.perf_counter()
+        page = fetch(start_from)
+        timings.append(time.perf_counter() - started)
+        status = workload.last_status()
+        if status != 200:
+            raise RuntimeError("Listing failed with {0}: {1}".format(status, page))
+        start_from = page.get("nextId")
+        if start_from is None:
+            return timings
+
+
+def measure(histograms: MutableMapping[str, LatencyHistogram], prefix: str, fetch: Callable[[Optional[str]], dict],
+            repeat: int) -> None:
+    """
+    Fetches every page of a listing `repeat` times, recording the first, middle, last and all pages under the prefix
+    """
+    for position in POSITIONS:
+        histograms[prefix + position] = LatencyHistogram()
+    for _ in range(repeat):
+        timings = list_all_pages(fetch)
+        histograms[prefix + "first"].record(timings[0])
+        histograms[prefix + "middle"].record(timings[len(timings) // 2])
+        histograms[prefix + "last"].record(timings[-1])
+        for timing in timings:
+            histograms[prefix + "all"].record(timing)
+    logger.info("Listed %s in %d pages", prefix.rstrip("/"), len(timings))
+
+
+def run_recordsets(client: VinylDNSClient, zones: MutableMapping[int, dict], page_size: int,
+                   repeat: int) -> MutableMapping[str, LatencyHistogram]:
+    """
+    Lists each zone in every scenario and sort order
+    :param zones: the filled zones, by the number of recordsets in them
+    :return: the page latencies, by "recordsets/size/scenario/sort/position"
+    """
+    histograms: MutableMapping[str, LatencyHistogram] = {}
+    for size, zone in sorted(zones.items()):
+        for scenario, filters in SCENARIOS:
+            for name_sort in NAME_SORTS:
+                measure(histograms, "recordsets/{0}/{1}/{2}/".format(size, scenario, name_sort),
+                        lambda start_from: client.list_recordsets_by_zone(
+                            zone["id"], start_from=start_from, max_items=page_size, name_sort=name_sort, **filters),
+                        repeat)
+    return histograms
+
+
+def run_zones(tenants: List[Tenant], steps: Sequence[Tuple[int, int]], zone_suffix: str, page_size: int,
+              repeat: int) -> MutableMapping[str, LatencyHistogram]:
+    """
+    Adds tenants and zones step by step, listing zones as the first tenant after each step
+    :param tenants: every tenant, without zones; each step uses as many of them as it asks for
+    :param steps: the number of tenants and zones per tenant of each step
+    :return: the page latencies, by "zones/<tenants>x<zones per tenant>/scenario/position"
+    """
+    histograms: MutableMapping[str, LatencyHistogram] = {}
+    client = tenants[0].client
+    scenarios = [
+        ("own", {}),
+        ("ignore-access", {"ignore_access": True}),
+        ("name-filter", {"ignore_access": True, "name_filter": tenants[0].prefix}),
+    ]
+    for tenant_count, zones_per_tenant in steps:
+        workload.add_zones(tenants[:tenant_count], zones_per_tenant, zone_suffix)
+        for scenario, filters in scenarios:
+            measure(histograms, "zones/{0}x{1}/{2}/".format(tenant_count, zones_per_tenant, scenario),
+                    lambda start_from: client.list_zones(start_from=start_from, max_items=page_size, **filters),
+                    repeat)
+    return histograms
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measures list latency as zones and tenants grow")
+    parser.add_argument("--url", default="http://localhost:9000", help="The url of the API")
+    parser.add_argument("--sizes", type=lambda v: [int(s) for s in v.split(",") if s], default=list(DEFAULT_SIZES),
+                        help="Comma separated numbers of recordsets to fill zones with, or nothing to skip listing "
+                             "recordsets (default: {0})".format(",".join(str(s) for s in DEFAULT_SIZES)))
+    parser.add_argument("--zone-steps", type=parse_zone_steps, default=default_zone_steps(),
+                        help="Comma separated tenants x zones per tenant to list zones at, or nothing to skip listing "
+                             "zones (default: {0})".format(",".join("{0}x{1}".format(*s)
+                                                                     for s in default_zone_steps())))
+    parser.add_argument("--page-size", type=int, default=100, help="The maxItems of each page")
+    parser.add_argument("--repeat", type=int, default=3, help="The number of times each listing is fetched")
+    parser.add_argument("--fill-batch-size", type=int, default=1000,
+                        help="Changes per batch change when filling zones; at most the API's batch change limit")
+    parser.add_argument("--zone-suffix", default=workload.DEFAULT_ZONE_SUFFIX,
+                        help="The domain zones are created under; the real API needs its backend to serve them")
+    results.add_arguments(parser)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    users = workload.writable_users()
+    tenant_count = max([1] + [tenants for tenants, _ in args.zone_steps])
+    tenants = workload.provision(args.url, users[:tenant_count], 0, zone_suffix=args.zone_suffix)
+    # the filled zones belong to a tenant of their own, deleted before the zone listings so they are not in them
+    filler = workload.provision(args.url, users[:1], len(args.sizes), zone_suffix=args.zone_suffix)[0] \
+        if args.sizes else None
+    histograms = {}
+    try:
+        if filler is not None:
+            zones = dict(zip(args.sizes, filler.zones))
+            for size, zone in zones.items():
+                workload.fill_zone(filler.client, zone, size, record_name, batch_size=args.fill_batch_size)
+            histograms.update(run_recordsets(filler.client, zones, args.page_size, args.repeat))
+            workload.tear_down([filler])
+            filler = None
+        if args.zone_steps:
+            histograms.update(run_zones(tenants, args.zone_steps, args.zone_suffix, args.page_size, args.repeat))
+    finally:
+        workload.tear_down(tenants + ([filler] if filler is not None else []))
+
+    print(format_summaries(histograms, "listing/page"))
+    results.report("list_scaling", dict((name, h.summary()) for name, h in histograms.items()), args)
+
+
+if __name__ == "__main__":
+    main()
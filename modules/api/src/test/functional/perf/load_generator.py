@@ -0,0 +1,272 @@
+"""
+An open-loop load generator for the VinylDNS API.
+
+Requests are started on a fixed schedule, at a target rate with exponential (or uniform) gaps between arrivals,
+whether or not earlier requests have completed.  The latency of each request is measured from the time it was
+scheduled to start, not from when a thread got round to sending it, so a slow API shows up as latency instead of as a
+lower request rate: a closed loop that waits for each response before sending the next request under-reports tail
+latency this way ("coordinated omission").  The delay between the scheduled and actual start is reported separately;
+if it grows, the generator needs more threads.
+
+Each request is one operation from a weighted mix (listing zones and recordsets, creating, updating and deleting
+recordsets, batch changes and group lookups), made by a random tenant in one of its zones; see `perf.workload`.  The
+report has latency percentiles per operation and per operation and status code.
+
+Run it with `python -m perf.load_generator --url http://localhost:9000 --rate 200 --duration 60`.
+"""
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, MutableMapping, Optional
+
+from perf import workload
+from perf.histogram import LatencyHistogram, format_summaries
+from perf.workload import Tenant
+from utils import create_recordset, get_change_A_AAAA_json
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIX = {
+    "list_zones": 15,
+    "list_recordsets": 30,
+    "create_recordset": 10,
+    "update_recordset": 10,
+    "delete_recordset": 5,
+    "batch_change": 5,
+    "get_group": 15,
+    "list_my_groups": 10
+}
+
+SCHEDULE_LAG = "schedule lag"
+
+
+def parse_mix(value: str) -> MutableMapping[str, float]:
+    """
+    Parses a mix like `list_zones=3,create_recordset=1` into the weight of each operation
+    """
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in LoadGenerator.operation_names():
+            raise argparse.ArgumentTypeError("unknown operation {0}, expected one of {1}"
+                                             .format(name, ", ".join(LoadGenerator.operation_names())))
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+class LoadGenerator(object):
+    """
+    Sends a mix of operations at a target rate and records their latency
+    """
+
+    def __init__(self, tenants: List[Tenant], mix: MutableMapping[str, float], rate: float, duration: float,
+                 warmup: float = 0.0, poisson: bool = True, max_workers: int = 256, batch_size: int = 5,
+                 seed: Optional[int] = None):
+        """
+        :param tenants: the tenants the operations are made by
+        :param mix: the weight of each operation
+        :param rate: the number of operations to start per second
+        :param duration: the number of seconds to send operations for, including the warmup
+        :param warmup: the number of seconds at the start whose operations are sent but not recorded
+        :param poisson: true for exponentially distributed gaps between operations, false for even gaps
+        :param max_workers: the number of threads sending requests; operations queue when they are all busy
+        :param batch_size: the largest number of changes in a batch change
+        :param seed: seeds the schedule and the choice of operations, tenants and zones
+        """
+        self.tenants = [t for t in tenants if t.zones]
+        self.operations = [(name, getattr(self, name)) for name in mix]
+        self.weights = list(mix.values())
+        self.rate = rate
+        self.duration = duration
+        self.warmup = warmup
+        self.poisson = poisson
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.rng = random.Random(seed)
+        self.local = threading.local()
+        self.latency: MutableMapping[str, LatencyHistogram] = dict((name, LatencyHistogram()) for name in mix)
+        self.by_status: MutableMapping[str, LatencyHistogram] = {}
+        self.lag = LatencyHistogram()
+        self.skipped: MutableMapping[str, int] = dict((name, 0) for name in mix)
+        self.lock = threading.Lock()
+        self.elapsed = 0.0
+
+    @classmethod
+    def operation_names(cls) -> List[str]:
+        return list(DEFAULT_MIX)
+
+    def thread_rng(self) -> random.Random:
+        if not hasattr(self.local, "rng"):
+            with self.lock:
+                self.local.rng = random.Random(self.rng.random())
+        return self.local.rng
+
+    # --- operations; each makes one request, or none if there is nothing to operate on ---
+
+    def list_zones(self, tenant: Tenant, zone: dict) -> None:
+        tenant.client.list_zones(max_items=100)
+
+    def list_recordsets(self, tenant: Tenant, zone: dict) -> None:
+        tenant.client.list_recordsets_by_zone(zone["id"], max_items=100)
+
+    def create_recordset(self, tenant: Tenant, zone: dict) -> None:
+        recordset = create_recordset(zone, "load-" + uuid.uuid4().hex[:12], "A", [{"address": "10.1.1.1"}], ttl=300)
+        change = tenant.client.create_recordset(recordset)
+        if isinstance(change, dict) and "recordSet" in change:
+            tenant.add_recordset(change["recordSet"])
+
+    def update_recordset(self, tenant: Tenant, zone: dict) -> bool:
+        recordset = tenant.pick_recordset(zone["id"], self.thread_rng())
+        if recordset is None:
+            return False
+        tenant.client.update_recordset(dict(recordset, ttl=self.thread_rng().randint(300, 3600)))
+        return True
+
+    def delete_recordset(self, tenant: Tenant, zone: dict) -> bool:
+        recordset = tenant.take_recordset(zone["id"], self.thread_rng())
+        if recordset is None:
+            return False
+        tenant.client.delete_recordset(zone["id"], recordset["id"])
+        return True
+
+    def batch_change(self, tenant: Tenant, zone: dict) -> None:
+        size = self.thread_rng().randint(1, self.batch_size)
+        changes = [get_change_A_AAAA_json("load-{0}.{1}".format(uuid.uuid4().hex[:12], zone["name"]),
+                                          address="10.2.2.{0}".format(i + 1)) for i in range(size)]
+        tenant.client.create_batch_change({"comments": "load generator", "changes": changes},
+                                          allow_manual_review=False)
+
+    def get_group(self, tenant: Tenant, zone: dict) -> None:
+        tenant.client.get_group(tenant.group["id"])
+
+    def list_my_groups(self, tenant: Tenant, zone: dict) -> None:
+        tenant.client.list_my_groups(max_items=100)
+
+    # --- running ---
+
+    def call(self, name: str, operation: Callable, tenant: Tenant, zone: dict, scheduled: float,
+             recorded: bool) -> None:
+        started = time.perf_counter()
+        workload.last_status()
+        try:
+            made_request = operation(tenant, zone) is not False
+            status = str(workload.last_status())
+        except Exception as e:
+            made_request = True
+            status = type(e).__name__
+        finished = time.perf_counter()
+
+        if not recorded:
+            return
+        if not made_request:
+            with self.lock:
+                self.skipped[name] += 1
+            return
+        self.latency[name].record(finished - scheduled)
+        self.lag.record(started - scheduled)
+        key = "{0} {1}".format(name, status)
+        with self.lock:
+            histogram = self.by_status.setdefault(key, LatencyHistogram())
+        histogram.record(finished - scheduled)
+
+    def run(self) -> None:
+        """
+        Sends operations on schedule until the duration is up, then waits for the ones in flight
+        """
+        cumulative = []
+        for weight in self.weights:
+            cumulative.append((cumulative[-1] if cumulative else 0) + weight)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="load") as executor:
+            start = time.perf_counter()
+            for scheduled, offset in workload.open_loop(self.rate, self.duration, self.rng, self.poisson):
+                name, operation = self.rng.choices(self.operations, cum_weights=cumulative)[0]
+                tenant = self.rng.choice(self.tenants)
+                zone = self.rng.choice(tenant.zones)
+                executor.submit(self.call, name, operation, tenant, zone, scheduled, offset >= self.warmup)
+        self.elapsed = time.perf_counter() - start
+
+    def report(self) -> dict:
+        recorded = sum(h.count for h in self.latency.values())
+        measured = max(self.elapsed - self.warmup, 1e-9)
+        return {
+            "rate": self.rate,
+            "duration": self.duration,
+            "warmup": self.warmup,
+            "elapsed": self.elapsed,
+            "requests": recorded,
+            "throughput": recorded / measured,
+            "skipped": dict((name, count) for name, count in self.skipped.items() if count),
+            "scheduleLag": self.lag.summary(),
+            "operations": dict((name, {"latency": h.summary(), "histogram": h.to_dict()})
+                               for name, h in self.latency.items()),
+            "statuses": dict((key, h.summary()) for key, h in sorted(self.by_status.items()))
+        }
+
+    def format_report(self) -> str:
+        report = self.report()
+        lines = ["{0} requests in {1:.1f}s after a {2:.1f}s warmup, {3:.1f}/s (target {4:.1f}/s)"
+                 .format(report["requests"], report["elapsed"] - self.warmup, self.warmup, report["throughput"],
+                         self.rate)]
+        if report["skipped"]:
+            lines.append("skipped for lack of recordsets: " +
+                         ", ".join("{0} {1}".format(n, c) for n, c in sorted(report["skipped"].items())))
+        lines.append("")
+        lines.append("latency from the scheduled start (ms):")
+        lines.append(format_summaries(dict(self.latency, **{SCHEDULE_LAG: self.lag})))
+        lines.append("by status (ms):")
+        lines.append(format_summaries(self.by_status, "operation status"))
+        return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Sends an open-loop mix of operations to the VinylDNS API")
+    parser.add_argument("--url", default="http://localhost:9000", help="The url of the API")
+    parser.add_argument("--rate", type=float, default=50.0, help="Operations started per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to send operations for")
+    parser.add_argument("--warmup", type=float, default=5.0,
+                        help="Seconds at the start whose operations are not recorded")
+    parser.add_argument("--uniform", dest="poisson", action="store_false",
+                        help="Space operations evenly instead of with exponentially distributed gaps")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="Weights of the operations, e.g. list_zones=3,create_recordset=1 (default: {0})"
+                        .format(",".join("{0}={1}".format(k, v) for k, v in DEFAULT_MIX.items())))
+    parser.add_argument("--users", type=int, default=len(workload.writable_users()),
+                        help="The number of test users to spread operations over")
+    parser.add_argument("--zones-per-user", type=int, default=2, help="Zones created for each user")
+    parser.add_argument("--records-per-zone", type=int, default=20,
+                        help="Recordsets each zone is seeded with, for updates and deletes to work on")
+    parser.add_argument("--zone-suffix", default=workload.DEFAULT_ZONE_SUFFIX,
+                        help="The domain zones are created under; the real API needs its backend to serve them")
+    parser.add_argument("--batch-size", type=int, default=5, help="The largest number of changes in a batch change")
+    parser.add_argument("--workers", type=int, default=256, help="Threads sending requests")
+    parser.add_argument("--seed", type=int, help="Seeds the schedule and the choice of operations")
+    parser.add_argument("--output", help="Writes the report, with the raw histograms, to this json file")
+    args = parser.parse_args()
+
+    users = workload.writable_users()
+    if not 0 < args.users <= len(users):
+        parser.error("--users must be between 1 and {0}, the number of test users".format(len(users)))
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    tenants = workload.provision(args.url, users[:args.users], args.zones_per_user, args.records_per_zone,
+                                 args.zone_suffix, pool_size=args.workers)
+    try:
+        generator = LoadGenerator(tenants, args.mix, args.rate, args.duration, args.warmup, args.poisson,
+                                  args.workers, args.batch_size, args.seed)
+        generator.run()
+        print(generator.format_report())
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(generator.report(), f, indent=2)
+    finally:
+        workload.tear_down(tenants)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Stores benchmark results as json and compares them against a baseline file, so a benchmark run can be used as a
+regression gate.
+"""
+import argparse
+import json
+import platform
+import sys
+from datetime import datetime
+from typing import Iterable, List, Mapping, MutableMapping, Optional
+
+# the statistics compared by default: the median, and the tail, which regresses first under contention
+DEFAULT_METRICS = ("p50", "p99")
+
+
+def write(path: str, benchmark: str, results: Mapping[str, Mapping[str, Optional[float]]],
+          parameters: Optional[Mapping] = None) -> None:
+    """
+    :param path: the file to write
+    :param benchmark: the name of the benchmark
+    :param results: the statistics (e.g. the summary of a `LatencyHistogram`) of each measurement, by name
+    :param parameters: the parameters the benchmark was run with
+    """
+    document = {"benchmark": benchmark, "created": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "python": platform.python_version(), "parameters": dict(parameters or {}), "results": results}
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+class Comparison(object):
+    """
+    A statistic of one measurement in the current results against the baseline
+    """
+
+    def __init__(self, name: str, metric: str, baseline: Optional[float], current: Optional[float],
+                 tolerance: float):
+        self.name = name
+        self.metric = metric
+        self.baseline = baseline
+        self.current = current
+        self.tolerance = tolerance
+
+    @property
+    def ratio(self) -> Optional[float]:
+        if self.baseline is None or self.current is None or self.baseline <= 0:
+            return None
+        return self.current / self.baseline
+
+    @property
+    def regressed(self) -> bool:
+        return self.ratio is not None and self.ratio > 1 + self.tolerance
+
+    @property
+    def improved(self) -> bool:
+        return self.ratio is not None and self.ratio < 1 - self.tolerance
+
+    @property
+    def verdict(self) -> str:
+        if self.baseline is None:
+            return "new"
+        if self.current is None:
+            return "missing"
+        return "REGRESSED" if self.regressed else "improved" if self.improved else "ok"
+
+
+def compare(current: Mapping[str, Mapping[str, Optional[float]]],
+            baseline: Mapping[str, Mapping[str, Optional[float]]],
+            metrics: Iterable[str] = DEFAULT_METRICS, tolerance: float = 0.1) -> List[Comparison]:
+    """
+    Compares the results of a run against a baseline; lower values are better
+    :param current: the `results` of the current run
+    :param baseline: the `results` of the baseline run
+    :param metrics: the statistics to compare
+    :param tolerance: how much slower (as a fraction of the baseline) a statistic can get before it counts as a
+    regression
+    :return: one comparison per measurement and metric, in the order of the measurement names
+    """
+    comparisons = []
+    for name in sorted(set(current) | set(baseline)):
+        for metric in metrics:
+            comparisons.append(Comparison(name, metric, baseline.get(name, {}).get(metric),
+                                          current.get(name, {}).get(metric), tolerance))
+    return comparisons
+
+
+def format_comparisons(comparisons: List[Comparison], scale: float = 1000.0) -> str:
+    """
+    Formats the comparisons as a table, with values multiplied by `scale` (milliseconds by default)
+    """
+    width = max([len("measurement")] + [len(c.name) for c in comparisons]) + 2
+
+    def cell(value: Optional[float]) -> str:
+        return "{0:>12.3f}".format(value * scale) if value is not None else "{0:>12}".format("-")
+
+    lines = ["{0:<{1}}{2:>8}{3:>12}{4:>12}{5:>9}  {6}".format("measurement", width, "metric", "baseline", "current",
+                                                               "ratio", "verdict")]
+    for c in comparisons:
+        ratio = "{0:>9.2f}".format(c.ratio) if c.ratio is not None else "{0:>9}".format("-")
+        lines.append("{0:<{1}}{2:>8}{3}{4}{5}  {6}".format(c.name, width, c.metric, cell(c.baseline),
+                                                           cell(c.current), ratio, c.verdict))
+    return "\n".join(lines) + "\n"
+
+
+def regressions(comparisons: List[Comparison]) -> MutableMapping[str, Comparison]:
+    """
+    :return: the comparisons that regressed, by "name metric"
+    """
+    return dict(("{0} {1}".format(c.name, c.metric), c) for c in comparisons if c.regressed)
+
+
+def add_arguments(parser: argparse.ArgumentParser, tolerance: float = 0.2) -> None:
+    """
+    Adds the --output, --baseline and --tolerance options that `report` reads
+    """
+    parser.add_argument("--output", help="Writes the results to this json file")
+    parser.add_argument("--baseline", help="Compares the results against this json file from an earlier run")
+    parser.add_argument("--tolerance", type=float, default=tolerance,
+                        help="The fraction by which a result may exceed the baseline before the run fails")
+
+
+def report(benchmark: str, results: Mapping[str, Mapping[str, Optional[float]]], args: argparse.Namespace,
+           metrics: Iterable[str] = DEFAULT_METRICS) -> None:
+    """
+    Writes the results to --output and compares them against --baseline, exiting with status 1 if any regressed
+    """
+    if args.output:
+        write(args.output, benchmark, results, vars(args))
+    if args.baseline:
+        comparisons = compare(results, load(args.baseline)["results"], metrics, args.tolerance)
+        print(format_comparisons(comparisons))
+        regressed = regressions(comparisons)
+        if regressed:
+            print("{0} result(s) regressed by more than {1:.0%}".format(len(regressed), args.tolerance))
+            sys.exit(1)
@@ -0,0 +1,1024 @@
+"""
+An in-memory stand-in for the VinylDNS API, for exercising and benchmarking the python tooling without the Scala
+stack, MySQL, the queue or bind9.
+
+It implements the routes `VinylDNSClient` uses (groups, zones, recordsets, recordset changes, batch changes, ACL rules,
+status, ping, health and color), authenticates requests with SigV4 the way `Aws4Authenticator` does, and applies
+changes asynchronously after a configurable latency, so the client's polling behaves as it does against the real API.
+Validation is limited to what the client relies on; this is not a functional model of the API.
+
+Run it with `python -m perf.stand_in_server --port 9000`, or start it in-process with `StandInServer`.
+"""
+import argparse
+import copy
+import hmac
+import heapq
+import ipaddress
+import itertools
+import json
+import logging
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, List, MutableMapping, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from botocore.auth import SigV4Auth
+from botocore.awsrequest import AWSRequest
+from botocore.credentials import Credentials
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ITEMS = 100
+MAX_ITEMS_LIMIT = 1000
+BACKEND_IDS = ["func-test-backend"]
+
+# The users loaded by TestDataLoader
+USERS = [
+    {"id": "testuser", "userName": "testuser", "accessKey": "testUserAccessKey", "secretKey": "testUserSecretKey"},
+    {"id": "ok", "userName": "ok", "accessKey": "okAccessKey", "secretKey": "okSecretKey"},
+    {"id": "dummy", "userName": "dummy", "accessKey": "dummyAccessKey", "secretKey": "dummySecretKey"},
+    {"id": "sharedZoneUser", "userName": "sharedZoneUser", "accessKey": "sharedZoneUserAccessKey",
+     "secretKey": "sharedZoneUserSecretKey"},
+    {"id": "locked", "userName": "locked", "accessKey": "lockedAccessKey", "secretKey": "lockedSecretKey",
+     "locked": True},
+    {"id": "list-group-user", "userName": "list-group-user", "accessKey": "listGroupAccessKey",
+     "secretKey": "listGroupSecretKey"},
+    {"id": "list-zones-user", "userName": "list-zones-user", "accessKey": "listZonesAccessKey",
+     "secretKey": "listZonesSecretKey"},
+    {"id": "history-id", "userName": "history-user", "accessKey": "history-key", "secretKey": "history-secret"},
+    {"id": "list-records-user", "userName": "list-records-user", "accessKey": "listRecordsAccessKey",
+     "secretKey": "listRecordsSecretKey"},
+    {"id": "list-batch-summaries-id", "userName": "list-batch-summaries-user",
+     "accessKey": "listBatchSummariesAccessKey", "secretKey": "listBatchSummariesSecretKey"},
+    {"id": "list-zero-summaries-id", "userName": "list-zero-summaries-user", "accessKey": "listZeroSummariesAccessKey",
+     "secretKey": "listZeroSummariesSecretKey"},
+    {"id": "support-user-id", "userName": "support-user", "accessKey": "supportUserAccessKey",
+     "secretKey": "supportUserSecretKey", "isSupport": True},
+    {"id": "super-user-id", "userName": "super-user", "accessKey": "superUserAccessKey",
+     "secretKey": "superUserSecretKey", "isSuper": True}
+]
+
+# The groups loaded by TestDataLoader that tests refer to by id
+GROUPS = [
+    {"id": "shared-zone-group", "name": "testSharedZoneGroup", "email": "email",
+     "members": ["sharedZoneUser"], "admins": ["sharedZoneUser"]},
+    {"id": "global-acl-group-id", "name": "globalACLGroup", "email": "email",
+     "members": ["ok", "dummy"], "admins": ["ok", "dummy"]},
+    {"id": "another-global-acl-group", "name": "globalACLGroup", "email": "email",
+     "members": ["testuser"], "admins": ["testuser"]}
+]
+
+ACCESS_LEVELS = ["NoAccess", "Read", "Write", "Delete"]
+UNAUTHENTICATED_ROUTES = {("GET", "/ping"), ("GET", "/health"), ("GET", "/color"), ("GET", "/status"),
+                          ("GET", "/metrics/prometheus")}
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def now() -> str:
+    return datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def new_id() -> str:
+    return str(uuid.uuid4())
+
+
+def absolute(name: str) -> str:
+    return name if name.endswith(".") else name + "."
+
+
+def page(items: List, start_from: Optional[str], max_items: int) -> Tuple[List, Optional[str]]:
+    """
+    Pages a list with integer offsets as the start keys
+    :return: the page, and the start key of the next page if there is one
+    """
+    start = int(start_from or 0)
+    end = start + max_items
+    return items[start:end], (str(end) if end < len(items) else None)
+
+
+class ChangeProcessor(object):
+    """
+    Applies changes after a delay on a background thread, like the API's queue consumers.  While processing is
+    disabled through the status endpoint, changes that are due are held until it is enabled again.
+    """
+
+    def __init__(self, latency: float, is_disabled: Callable[[], bool]):
+        self.latency = latency
+        self.is_disabled = is_disabled
+        self.queue: List[Tuple[float, int, Callable[[], None]]] = []
+        self.sequence = itertools.count()
+        self.condition = threading.Condition()
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="stand-in-processor", daemon=True)
+        self.thread.start()
+
+    def submit(self, fn: Callable[[], None]) -> None:
+        with self.condition:
+            heapq.heappush(self.queue, (time.monotonic() + self.latency, next(self.sequence), fn))
+            self.condition.notify()
+
+    def run(self) -> None:
+        while True:
+            with self.condition:
+                while self.running and (not self.queue or self.is_disabled()
+                                        or self.queue[0][0] > time.monotonic()):
+                    timeout = None if not self.queue else max(0.0, self.queue[0][0] - time.monotonic())
+                    self.condition.wait(0.05 if self.is_disabled() else timeout)
+                if not self.running:
+                    return
+                _, _, fn = heapq.heappop(self.queue)
+            try:
+                fn()
+            except Exception:
+                logger.exception("Failed to apply change")
+
+    def wake(self) -> None:
+        with self.condition:
+            self.condition.notify()
+
+    def stop(self) -> None:
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        self.thread.join()
+
+
+class StandInApi(object):
+    """
+    The state of the stand-in and the handlers for its routes.  All state is guarded by one lock; handlers are short,
+    so this does not limit throughput in practice.
+    """
+
+    def __init__(self, latency: float = 0.05, verify_signatures: bool = True):
+        self.verify_signatures = verify_signatures
+        self.lock = threading.RLock()
+        self.users_by_key = dict((u["accessKey"], u) for u in USERS)
+        self.users_by_id = dict((u["id"], u) for u in USERS)
+        self.groups: MutableMapping[str, dict] = {}
+        self.group_changes: MutableMapping[str, List[dict]] = {}
+        self.zones: MutableMapping[str, dict] = {}
+        self.zone_changes: MutableMapping[str, List[dict]] = {}
+        self.recordsets: MutableMapping[str, MutableMapping[str, dict]] = {}
+        # per zone, the id of each recordset by name and type, and the recordsets sorted for listing (built on demand)
+        self.recordset_index: MutableMapping[str, MutableMapping[Tuple[str, str], str]] = {}
+        self.sorted_recordsets: MutableMapping[str, List[dict]] = {}
+        self.recordset_changes: MutableMapping[str, List[dict]] = {}
+        self.batch_changes: MutableMapping[str, dict] = {}
+        self.batch_changes_remaining: MutableMapping[str, int] = {}
+        self.processing_disabled = False
+        self.request_count = 0
+        self.processor = ChangeProcessor(latency, lambda: self.processing_disabled)
+
+        for group in GROUPS:
+            self.groups[group["id"]] = self.group_document(group["id"], group["name"], group["email"],
+                                                           group["members"], group["admins"])
+
+        self.routes: List[Tuple[str, Any, Callable]] = [
+            ("GET", "/ping", self.ping),
+            ("GET", "/health", self.health),
+            ("GET", "/color", self.color),
+            ("GET", "/status", self.get_status),
+            ("POST", "/status", self.post_status),
+            ("GET", "/metrics/prometheus", self.prometheus),
+            ("POST", "/groups", self.create_group),
+            ("GET", "/groups", self.list_my_groups),
+            ("GET", "/groups/{id}", self.get_group),
+            ("PUT", "/groups/{id}", self.update_group),
+            ("DELETE", "/groups/{id}", self.delete_group),
+            ("GET", "/groups/{id}/members", self.list_group_members),
+            ("GET", "/groups/{id}/admins", self.list_group_admins),
+            ("GET", "/groups/{id}/activity", self.list_group_activity),
+            ("POST", "/zones", self.create_zone),
+            ("GET", "/zones", self.list_zones),
+            ("GET", "/zones/backendids", self.backend_ids),
+            ("POST", "/zones/batchrecordchanges", self.create_batch_change),
+            ("GET", "/zones/batchrecordchanges", self.list_batch_change_summaries),
+            ("GET", "/zones/batchrecordchanges/{id}", self.get_batch_change),
+            ("POST", "/zones/batchrecordchanges/{id}/approve", self.review_batch_change),
+            ("POST", "/zones/batchrecordchanges/{id}/reject", self.review_batch_change),
+            ("POST", "/zones/batchrecordchanges/{id}/cancel", self.review_batch_change),
+            ("GET", "/zones/name/{name}", self.get_zone_by_name),
+            ("GET", "/zones/{id}", self.get_zone),
+            ("PUT", "/zones/{id}", self.update_zone),
+            ("DELETE", "/zones/{id}", self.delete_zone),
+            ("GET", "/zones/{id}/details", self.get_zone_details),
+            ("POST", "/zones/{id}/sync", self.sync_zone),
+            ("GET", "/zones/{id}/changes", self.list_zone_changes),
+            ("PUT", "/zones/{id}/acl/rules", self.add_acl_rule),
+            ("DELETE", "/zones/{id}/acl/rules", self.delete_acl_rule),
+            ("POST", "/zones/{id}/recordsets", self.create_recordset),
+            ("GET", "/zones/{id}/recordsets", self.list_recordsets),
+            ("GET", "/zones/{id}/recordsetcount", self.count_recordsets),
+            ("GET", "/zones/{id}/recordsets/{rs}", self.get_recordset),
+            ("PUT", "/zones/{id}/recordsets/{rs}", self.update_recordset),
+            ("DELETE", "/zones/{id}/recordsets/{rs}", self.delete_recordset),
+            ("GET", "/zones/{id}/recordsets/{rs}/changes/{change}", self.get_recordset_change),
+            ("GET", "/zones/{id}/recordsetchanges", self.list_recordset_changes),
+            ("GET", "/recordsetchange/history", self.list_recordset_change_history),
+        ]
+        self.routes = [(method, re.compile("^" + re.sub(r"{(\w+)}", r"(?P<\1>[^/]+)", path) + "$"), handler)
+                       for method, path, handler in self.routes]
+
+    def close(self) -> None:
+        self.processor.stop()
+
+    # --- request handling ---
+
+    def handle(self, method: str, raw_path: str, headers, body: bytes, host: str) -> Tuple[int, Any]:
+        """
+        Authenticates and routes a request
+        :return: the status code and either a json document or a text body
+        """
+        split = urlsplit(raw_path)
+        query = dict((k, v[-1]) for k, v in parse_qs(split.query, keep_blank_values=True).items())
+        with self.lock:
+            self.request_count += 1
+
+        try:
+            for route_method, pattern, handler in self.routes:
+                match = pattern.match(split.path)
+                if match is None or route_method != method:
+                    continue
+                user = None
+                if (method, split.path) not in UNAUTHENTICATED_ROUTES:
+                    user = self.authenticate(method, split.path, split.query, headers, body, host)
+                document = json.loads(body) if body and body.strip() not in (b"", b"null") else None
+                with self.lock:
+                    return handler(user=user, query=query, body=document, **match.groupdict())
+            raise ApiError(404, "The requested resource could not be found.")
+        except ApiError as e:
+            return e.status, e.message
+        except (ValueError, KeyError, TypeError) as e:
+            return 400, "Invalid request: {0}".format(e)
+
+    def authenticate(self, method: str, path: str, query_string: str, headers, body: bytes, host: str) -> dict:
+        """
+        Verifies the SigV4 signature of a request the way `Aws4Authenticator` does: the canonical request is rebuilt
+        from the signed headers and the signature recomputed with the secret of the access key in the credential
+        """
+        authorization = headers.get("Authorization")
+        if not authorization:
+            raise ApiError(401, "Authentication Failed: Authorization header not found")
+
+        match = re.match(r"AWS4-HMAC-SHA256 *Credential=([^/]*)/([0-9]{8})/([^/]*)/([^/]*)/aws4_request, *"
+                         r"SignedHeaders=([^,]+), *Signature=([a-f0-9]{64})$", authorization)
+        if match is None:
+            raise ApiError(401, "Authentication Failed: Authorization header could not be parsed")
+        access_key, _, region, service, signed_headers, signature = match.groups()
+
+        user = self.users_by_key.get(access_key)
+        if user is None:
+            raise ApiError(401, "Authentication Failed: Account with accessKey {0} specified was not found"
+                           .format(access_key))
+        if user.get("locked"):
+            raise ApiError(403, "Authentication Failed: Account with username {0} is locked".format(user["userName"]))
+        if not self.verify_signatures:
+            return user
+
+        # query parameters are flattened the same way VinylDNSClient does before signing
+        params = dict((k, v if len(v) > 1 else v[0]) for k, v in parse_qs(query_string).items())
+        signed = dict((name, host if name == "host" else headers.get(name, ""))
+                      for name in signed_headers.split(";"))
+        request = AWSRequest(method=method, url="http://{0}{1}".format(host, path), params=params, data=body,
+                             headers=signed)
+        request.context["timestamp"] = headers.get("X-Amz-Date", "")
+        auth = SigV4Auth(Credentials(access_key, user["secretKey"]), service, region)
+        expected = auth.signature(auth.string_to_sign(request, auth.canonical_request(request)), request)
+        if not hmac.compare_digest(expected, signature):
+            raise ApiError(401, "Authentication Failed: Request signature could not be validated")
+        return user
+
+    # --- access ---
+
+    def is_admin(self, user: dict) -> bool:
+        return user.get("isSuper", False) or user.get("isSupport", False)
+
+    def user_groups(self, user: dict) -> List[str]:
+        return [g["id"] for g in self.groups.values() if user["id"] in g["memberIds"]]
+
+    def is_zone_admin(self, user: dict, zone: dict) -> bool:
+        return user.get("isSuper", False) or user["id"] in self.groups.get(zone["adminGroupId"], {}).get("memberIds", ())
+
+    def access_level(self, user: dict, zone: dict, record_name: Optional[str] = None,
+                     record_type: Optional[str] = None) -> str:
+        if self.is_zone_admin(user, zone):
+            return "Delete"
+
+        level = "Write" if zone.get("shared") else "NoAccess"
+        if user.get("isSupport") and ACCESS_LEVELS.index(level) < ACCESS_LEVELS.index("Read"):
+            level = "Read"
+
+        groups = set(self.user_groups(user))
+        for rule in zone["acl"]["rules"]:
+            if rule.get("userId") not in (None, user["id"]) or rule.get("groupId") not in (None, *groups):
+                continue
+            if record_type is not None and rule.get("recordTypes") and record_type not in rule["recordTypes"]:
+                continue
+            if record_name is not None and rule.get("recordMask") and \
+                    not re.fullmatch(rule["recordMask"], record_name):
+                continue
+            if ACCESS_LEVELS.index(rule["accessLevel"]) > ACCESS_LEVELS.index(level):
+                level = rule["accessLevel"]
+        return level
+
+    def require(self, allowed: bool, message: str) -> None:
+        if not allowed:
+            raise ApiError(403, message)
+
+    # --- status ---
+
+    def ping(self, **_):
+        return 200, "PONG"
+
+    def health(self, **_):
+        return 200, ""
+
+    def color(self, **_):
+        return 200, "blue"
+
+    def status_document(self) -> dict:
+        return {"processingDisabled": self.processing_disabled, "color": "blue", "keyName": "vinyldns.",
+                "version": "stand-in"}
+
+    def get_status(self, **_):
+        return 200, self.status_document()
+
+    def post_status(self, user, query, **_):
+        self.require(self.is_admin(user),
+                     "Not authorized. User '{0}' cannot make the requested change.".format(user["userName"]))
+        self.processing_disabled = query["processingDisabled"].lower() == "true"
+        self.processor.wake()
+        return 200, self.status_document()
+
+    def prometheus(self, **_):
+        pending = len(self.processor.queue)
+        lines = ["# TYPE stand_in_requests_total counter", "stand_in_requests_total {0}".format(self.request_count),
+                 "# TYPE stand_in_pending_changes gauge", "stand_in_pending_changes {0}".format(pending)]
+        return 200, "\n".join(lines) + "\n"
+
+    # --- groups ---
+
+    def group_document(self, group_id, name, email, member_ids, admin_ids, description=None) -> dict:
+        return {"id": group_id, "name": name, "email": email, "description": description, "created": now(),
+                "status": "Active", "memberIds": set(member_ids) | set(admin_ids), "adminUserIds": set(admin_ids)}
+
+    def render_group(self, group: dict) -> dict:
+        rendered = dict((k, v) for k, v in group.items() if k not in ("memberIds", "adminUserIds"))
+        rendered["members"] = [{"id": m} for m in sorted(group["memberIds"])]
+        rendered["admins"] = [{"id": a} for a in sorted(group["adminUserIds"])]
+        return rendered
+
+    def find_group(self, group_id: str) -> dict:
+        group = self.groups.get(group_id)
+        if group is None or group["status"] == "Deleted":
+            raise ApiError(404, "Group with ID {0} was not found".format(group_id))
+        return group
+
+    def record_group_change(self, user, group, change_type) -> None:
+        self.group_changes.setdefault(group["id"], []).insert(0, {
+            "id": new_id(), "newGroup": self.render_group(group), "changeType": change_type, "userId": user["id"],
+            "created": now()})
+
+    def create_group(self, user, body, **_):
+        name = body["name"]
+        if any(g["name"] == name and g["status"] != "Deleted" for g in self.groups.values()):
+            raise ApiError(409, "Group with name {0} already exists. Please try a different name or contact {1} "
+                                "to be added to the group.".format(name, body.get("email")))
+        group = self.group_document(new_id(), name, body["email"], [m["id"] for m in body.get("members", [])],
+                                    [a["id"] for a in body.get("admins", [])], body.get("description"))
+        self.groups[group["id"]] = group
+        self.record_group_change(user, group, "Create")
+        return 200, self.render_group(group)
+
+    def get_group(self, user, id, **_):
+        return 200, self.render_group(self.find_group(id))
+
+    def update_group(self, user, id, body, **_):
+        group = self.find_group(id)
+        self.require(user.get("isSuper") or user["id"] in group["adminUserIds"], "Not authorized")
+        group.update(name=body["name"], email=body["email"], description=body.get("description"))
+        group["adminUserIds"] = set(a["id"] for a in body.get("admins", []))
+        group["memberIds"] = set(m["id"] for m in body.get("members", [])) | group["adminUserIds"]
+        self.record_group_change(user, group, "Update")
+        return 200, self.render_group(group)
+
+    def delete_group(self, user, id, **_):
+        group = self.find_group(id)
+        self.require(user.get("isSuper") or user["id"] in group["adminUserIds"], "Not authorized")
+        zone = next((z for z in self.zones.values() if z["adminGroupId"] == id and z["status"] != "Deleted"), None)
+        if zone is not None:
+            raise ApiError(400, "{0} is the admin of a zone. Cannot delete. Please transfer the ownership to another "
+                                "group before deleting.".format(group["name"]))
+        group["status"] = "Deleted"
+        self.record_group_change(user, group, "Delete")
+        return 200, self.render_group(group)
+
+    def list_my_groups(self, user, query, **_):
+        ignore_access = query.get("ignoreAccess", "false").lower() == "true"
+        name_filter = query.get("groupNameFilter")
+        max_items = int(query.get("maxItems", DEFAULT_MAX_ITEMS))
+        groups = [g for g in self.groups.values() if g["status"] != "Deleted"
+                  and (user["id"] in g["memberIds"] or (ignore_access or self.is_admin(user)))
+                  and (not name_filter or name_filter.lower() in g["name"].lower())]
+        groups.sort(key=lambda g: g["name"].lower())
+
+        start_from = query.get("startFrom")
+        if start_from:
+            groups = [g for g in groups if g["name"].lower() > start_from.lower()]
+        result = {"groups": [self.render_group(g) for g in groups[:max_items]], "maxItems": max_items,
+                  "ignoreAccess": ignore_access}
+        if start_from:
+            result["startFrom"] = start_from
+        if name_filter:
+            result["groupNameFilter"] = name_filter
+        if len(groups) > max_items:
+            result["nextId"] = groups[max_items - 1]["name"]
+        return 200, result
+
+    def list_group_members(self, user, id, query, **_):
+        group = self.find_group(id)
+        members = [self.member_document(m, group) for m in sorted(group["memberIds"])]
+        members, next_id = page(members, query.get("startFrom"), int(query.get("maxItems", DEFAULT_MAX_ITEMS)))
+        result = {"members": members, "maxItems": int(query.get("maxItems", DEFAULT_MAX_ITEMS))}
+        if next_id is not None:
+            result["nextId"] = next_id
+        return 200, result
+
+    def member_document(self, user_id: str, group: dict) -> dict:
+        user = self.users_by_id.get(user_id, {"id": user_id, "userName": user_id})
+        return {"id": user_id, "userName": user["userName"], "isAdmin": user_id in group["adminUserIds"],
+                "lockStatus": "Locked" if user.get("locked") else "Unlocked"}
+
+    def list_group_admins(self, user, id, **_):
+        group = self.find_group(id)
+        return 200, {"admins": [self.member_document(a, group) for a in sorted(group["adminUserIds"])]}
+
+    def list_group_activity(self, user, id, query, **_):
+        self.find_group(id)
+        max_items = int(query.get("maxItems", DEFAULT_MAX_ITEMS))
+        changes, next_id = page(self.group_changes.get(id, []), query.get("startFrom"), max_items)
+        result = {"changes": changes, "maxItems": max_items}
+        if next_id is not None:
+            result["nextId"] = next_id
+        return 200, result
+
+    # --- zones ---
+
+    def find_zone(self, zone_id: str) -> dict:
+        zone = self.zones.get(zone_id)
+        if zone is None or zone["status"] == "Deleted":
+            raise ApiError(404, "Zone with id {0} does not exist".format(zone_id))
+        return zone
+
+    def visible_zone(self, user: dict, zone_id: str) -> dict:
+        zone = self.find_zone(zone_id)
+        self.require(self.access_level(user, zone) != "NoAccess" or user.get("isSupport"),
+                     "User {0} does not have access to zone {1}".format(user["userName"], zone["name"]))
+        return zone
+
+    def administered_zone(self, user: dict, zone_id: str) -> dict:
+        zone = self.find_zone(zone_id)
+        self.require(self.is_zone_admin(user, zone) or user.get("isSupport"),
+                     "User {0} is not authorized. Contact a zone owner group: {1} at {2} to make DNS changes."
+                     .format(user["userName"], self.groups.get(zone["adminGroupId"], {}).get("name"), zone["email"]))
+        return zone
+
+    def render_zone(self, zone: dict) -> dict:
+        rendered = copy.deepcopy(zone)
+        rendered["adminGroupName"] = self.groups.get(zone["adminGroupId"], {}).get("name", "Unknown group name")
+        return rendered
+
+    def zone_change(self, user: dict, zone: dict, change_type: str, apply: Callable[[], None]) -> dict:
+        """
+        Records a pending zone change and schedules it
+        """
+        change = {"zone": self.render_zone(zone), "userId": user["id"], "changeType": change_type,
+                  "status": "Pending", "created": now(), "id": new_id()}
+        self.zone_changes.setdefault(zone["id"], []).insert(0, change)
+
+        def process():
+            with self.lock:
+                apply()
+                change["status"] = "Synced"
+                change["zone"] = self.render_zone(zone)
+
+        self.processor.submit(process)
+        return change
+
+    def create_zone(self, user, body, **_):
+        name = absolute(body["name"])
+        if any(z["name"] == name and z["status"] != "Deleted" for z in self.zones.values()):
+            raise ApiError(409, "Zone with name {0} already exists. Please contact {1} to request access to the zone."
+                           .format(name, body.get("email")))
+        group = self.find_group(body["adminGroupId"])
+        self.require(user.get("isSuper") or user["id"] in group["memberIds"],
+                     "User '{0}' must be a member of group '{1}' to create a zone."
+                     .format(user["userName"], group["name"]))
+
+        zone = dict((k, v) for k, v in body.items() if k not in ("id", "status"))
+        zone.update(name=name, id=new_id(), status="Syncing", created=now(), account="system",
+                    shared=body.get("shared", False), isTest=body.get("isTest", False))
+        zone.setdefault("acl", {"rules": []})
+        self.zones[zone["id"]] = zone
+        self.recordsets[zone["id"]] = {}
+        self.recordset_index[zone["id"]] = {}
+
+        def activate():
+            zone["status"] = "Active"
+            zone["latestSync"] = now()
+
+        return 202, self.zone_change(user, zone, "Create", activate)
+
+    def get_zone(self, user, id, **_):
+        return 200, {"zone": self.render_zone(self.visible_zone(user, id))}
+
+    def get_zone_by_name(self, user, name, **_):
+        name = absolute(name)
+        zone = next((z for z in self.zones.values() if z["name"] == name and z["status"] != "Deleted"), None)
+        if zone is None:
+            raise ApiError(404, "Zone with name {0} does not exist".format(name))
+        return 200, {"zone": self.render_zone(self.visible_zone(user, zone["id"]))}
+
+    def get_zone_details(self, user, id, **_):
+        zone = self.find_zone(id)
+        return 200, {"zone": dict((k, self.render_zone(zone)[k])
+                                  for k in ("name", "email", "adminGroupId", "adminGroupName"))}
+
+    def backend_ids(self, **_):
+        return 200, BACKEND_IDS
+
+    def update_zone(self, user, id, body, **_):
+        zone = self.administered_zone(user, id)
+        updates = dict((k, v) for k, v in body.items() if k not in ("id", "name", "status", "created", "account"))
+        return 202, self.zone_change(user, zone, "Update", lambda: zone.update(updates))
+
+    def delete_zone(self, user, id, **_):
+        zone = self.administered_zone(user, id)
+        return 202, self.zone_change(user, zone, "Delete", lambda: zone.update(status="Deleted"))
+
+    def sync_zone(self, user, id, **_):
+        zone = self.administered_zone(user, id)
+        return 202, self.zone_change(user, zone, "Sync", lambda: zone.update(latestSync=now()))
+
+    def list_zones(self, user, query, **_):
+        ignore_access = query.get("ignoreAccess", "false").lower() == "true"
+        by_admin_group = query.get("searchByAdminGroup", "false").lower() == "true"
+        name_filter = query.get("nameFilter")
+        max_items = int(query.get("maxItems", DEFAULT_MAX_ITEMS))
+        if not 0 < max_items <= MAX_ITEMS_LIMIT:
+            raise ApiError(400, "maxItems was {0}, maxItems must be between 0 and {1}"
+                           .format(max_items, MAX_ITEMS_LIMIT))
+
+        def matches(zone):
+            if not name_filter:
+                return True
+            value = self.groups.get(zone["adminGroupId"], {}).get("name", "") if by_admin_group else zone["name"]
+            return name_filter.rstrip("*").lower() in value.lower()
+
+        zones = [z for z in self.zones.values() if z["status"] != "Deleted" and matches(z)
+                 and (ignore_access or self.is_admin(user) or self.access_level(user, z) != "NoAccess")]
+        zones.sort(key=lambda z: z["name"])
+        start_from = query.get("startFrom")
+        if start_from:
+            zones = [z for z in zones if z["name"] > start_from]
+
+        rendered = []
+        for zone in zones[:max_items]:
+            document = self.render_zone(zone)
+            document["accessLevel"] = self.access_level(user, zone)
+            rendered.append(document)
+        result = {"zones": rendered, "maxItems": max_items, "ignoreAccess": ignore_access,
+                  "searchByAdminGroup": by_admin_group, "includeReverse": True}
+        if name_filter:
+            result["nameFilter"] = name_filter
+        if start_from:
+            result["startFrom"] = start_from
+        if len(zones) > max_items:
+            result["nextId"] = zones[max_items - 1]["name"]
+        return 200, result
+
+    def list_zone_changes(self, user, id, query, **_):
+        self.visible_zone(user, id)
+        max_items = int(query.get("maxItems", DEFAULT_MAX_ITEMS))
+        changes, next_id = page(self.zone_changes.get(id, []), query.get("startFrom"), max_items)
+        result = {"zoneId": id, "zoneChanges": changes, "maxItems": max_items}
+        if query.get("startFrom"):
+            result["startFrom"] = query["startFrom"]
+        if next_id is not None:
+            result["nextId"] = next_id
+        return 200, result
+
+    def add_acl_rule(self, user, id, body, **_):
+        zone = self.administered_zone(user, id)
+
+        def add():
+            if body not in zone["acl"]["rules"]:
+                zone["acl"]["rules"].append(body)
+
+        return 202, self.zone_change(user, zone, "Update", add)
+
+    def delete_acl_rule(self, user, id, body, **_):
+        zone = self.administered_zone(user, id)
+
+        def delete():
+            zone["acl"]["rules"] = [r for r in zone["acl"]["rules"] if r != body]
+
+        return 202, self.zone_change(user, zone, "Update", delete)
+
+    # --- recordsets ---
+
+    def fqdn(self, name: str, zone: dict) -> str:
+        if name in ("@", zone["name"], zone["name"][:-1]):
+            return zone["name"]
+        return absolute(name) if name.endswith(zone["name"]) else "{0}.{1}".format(name, zone["name"])
+
+    def find_recordset(self, zone_id: str, rs_id: str) -> dict:
+        recordset = self.recordsets.get(zone_id, {}).get(rs_id)
+        if recordset is None:
+            raise ApiError(404, "RecordSet with id {0} does not exist in zone {1}".format(rs_id, zone_id))
+        return recordset
+
+    def recordset_by_name(self, zone_id: str, name: str, record_type: str) -> Optional[dict]:
+        rs_id = self.recordset_index[zone_id].get((name, record_type))
+        return self.recordsets[zone_id][rs_id] if rs_id is not None else None
+
+    def store_recordset(self, zone_id: str, recordset: dict) -> None:
+        """
+        Stores a new or updated recordset, keeping the index of the zone current
+        """
+        previous = self.recordsets[zone_id].get(recordset["id"])
+        if previous is not None and self.recordset_index[zone_id].get((previous["name"], previous["type"])) == \
+                previous["id"]:
+            del self.recordset_index[zone_id][(previous["name"], previous["type"])]
+        self.recordsets[zone_id][recordset["id"]] = recordset
+        self.recordset_index[zone_id][(recordset["name"], recordset["type"])] = recordset["id"]
+        self.sorted_recordsets.pop(zone_id, None)
+
+    def remove_recordset(self, zone_id: str, rs_id: str) -> None:
+        recordset = self.recordsets[zone_id].pop(rs_id, None)
+        if recordset is not None:
+            self.recordset_index[zone_id].pop((recordset["name"], recordset["type"]), None)
+            self.sorted_recordsets.pop(zone_id, None)
+
+    def recordset_change(self, user: dict, zone: dict, recordset: dict, change_type: str,
+                         apply: Callable[[], None], batch_change_id: Optional[str] = None) -> dict:
+        """
+        Records a pending recordset change and schedules it
+        """
+        change = {"zone": self.render_zone(zone), "recordSet": copy.deepcopy(recordset), "userId": user["id"],
+                  "changeType": change_type, "status": "Pending", "created": now(), "id": new_id(),
+                  "singleBatchChangeIds": [batch_change_id] if batch_change_id else []}
+        self.recordset_changes.setdefault(zone["id"], []).insert(0, change)
+
+        def process():
+            with self.lock:
+                apply()
+                change["status"] = "Complete"
+                change["recordSet"]["status"] = "Active" if change_type != "Delete" else "Inactive"
+
+        self.processor.submit(process)
+        return change
+
+    def create_recordset(self, user, id, body, **_):
+        zone = self.find_zone(id)
+        name, record_type = body["name"], body["type"]
+        self.require(ACCESS_LEVELS.index(self.access_level(user, zone, name, record_type)) >= 2,
+                     "User {0} does not have access to create {1}.{2}".format(user["userName"], name, zone["name"]))
+        if self.recordset_by_name(id, name, record_type) is not None:
+            raise ApiError(409, "RecordSet with name {0} and type {1} already exists in zone {2}"
+                           .format(name, record_type, zone["name"]))
+
+        recordset = dict(body, id=new_id(), zoneId=id, status="Pending", created=now(), account="system",
+                         fqdn=self.fqdn(name, zone))
+
+        def create():
+            self.store_recordset(id, dict(recordset, status="Active"))
+
+        return 202, self.recordset_change(user, zone, recordset, "Create", create)
+
+    def get_recordset(self, user, id, rs, **_):
+        self.visible_zone(user, id)
+        return 200, {"recordSet": copy.deepcopy(self.find_recordset(id, rs))}
+
+    def update_recordset(self, user, id, rs, body, **_):
+        zone = self.find_zone(id)
+        existing = self.find_recordset(id, rs)
+        self.require(ACCESS_LEVELS.index(self.access_level(user, zone, existing["name"], existing["type"])) >= 2,
+                     "User {0} does not have access to update {1}.{2}"
+                     .format(user["userName"], existing["name"], zone["name"]))
+        recordset = dict(existing, **dict((k, v) for k, v in body.items() if k not in ("id", "zoneId", "status")))
+        recordset.update(status="PendingUpdate", updated=now(), fqdn=self.fqdn(recordset["name"], zone))
+
+        def update():
+            self.store_recordset(id, dict(recordset, status="Active"))
+
+        return 202, self.recordset_change(user, zone, recordset, "Update", update)
+
+    def delete_recordset(self, user, id, rs, **_):
+        zone = self.find_zone(id)
+        existing = self.find_recordset(id, rs)
+        self.require(ACCESS_LEVELS.index(self.access_level(user, zone, existing["name"], existing["type"])) >= 3,
+                     "User {0} does not have access to delete {1}.{2}"
+                     .format(user["userName"], existing["name"], zone["name"]))
+        recordset = dict(existing, status="PendingDelete")
+        return 202, self.recordset_change(user, zone, recordset, "Delete",
+                                          lambda: self.remove_recordset(id, rs))
+
+    def list_recordsets(self, user, id, query, **_):
+        self.visible_zone(user, id)
+        name_filter = query.get("recordNameFilter")
+        type_filter = query.get("recordTypeFilter")
+        name_sort = query.get("nameSort", "ASC").upper()
+        max_items = int(query.get("maxItems", DEFAULT_MAX_ITEMS))
+        if not 0 < max_items <= DEFAULT_MAX_ITEMS:
+            raise ApiError(400, "maxItems was {0}, maxItems must be between 0 exclusive and {1} inclusive"
+                           .format(max_items, DEFAULT_MAX_ITEMS))
+
+        pattern = re.compile(re.escape(name_filter).replace(r"\*", ".*"), re.IGNORECASE) if name_filter else None
+        types = set(type_filter.split(",")) if type_filter else None
+        listing = self.sorted_recordsets.get(id)
+        if listing is None:
+            listing = self.sorted_recordsets[id] = sorted(self.recordsets[id].values(),
+                                                          key=lambda r: (r["name"], r["type"]))
+        recordsets = [r for r in listing
+                      if (pattern is None or pattern.fullmatch(r["name"])) and (types is None or r["type"] in types)]
+        if name_sort == "DESC":
+            recordsets.reverse()
+        recordsets, next_id = page(recordsets, query.get("startFrom"), max_items)
+
+        result = {"recordSets": copy.deepcopy(recordsets), "maxItems": max_items, "nameSort": name_sort}
+        for key in ("startFrom", "recordNameFilter", "recordTypeFilter"):
+            if query.get(key):
+                result[key] = query[key]
+        if next_id is not None:
+            result["nextId"] = next_id
+        return 200, result
+
+    def count_recordsets(self, user, id, **_):
+        self.visible_zone(user, id)
+        return 200, {"count": len(self.recordsets[id])}
+
+    def get_recordset_change(self, user, id, rs, change, **_):
+        self.visible_zone(user, id)
+        found = next((c for c in self.recordset_changes.get(id, []) if c["id"] == change), None)
+        if found is None:
+            raise ApiError(404, "RecordSetChange with id {0} cannot be found in zone {1}".format(change, id))
+        return 200, found
+
+    def list_recordset_changes(self, user, id, query, **_):
+        self.visible_zone(user, id)
+        max_items = int(query.get("maxItems", DEFAULT_MAX_ITEMS))
+        changes, next_id = page(self.recordset_changes.get(id, []), query.get("startFrom"), max_items)
+        result = {"zoneId": id, "recordSetChanges": changes, "maxItems": max_items}
+        if query.get("startFrom"):
+            result["startFrom"] = int(query["startFrom"])
+        if next_id is not None:
+            result["nextId"] = int(next_id)
+        return 200, result
+
+    def list_recordset_change_history(self, user, query, **_):
+        zone_id = query["zoneId"]
+        self.visible_zone(user, zone_id)
+        fqdn, record_type = absolute(query["fqdn"]), query["recordType"]
+        max_items = int(query.get("maxItems", DEFAULT_MAX_ITEMS))
+        history = [c for c in self.recordset_changes.get(zone_id, [])
+                   if c["recordSet"]["fqdn"] == fqdn and c["recordSet"]["type"] == record_type]
+        changes, next_id = page(history, query.get("startFrom"), max_items)
+        result = {"zoneId": zone_id, "recordSetChanges": changes, "maxItems": max_items}
+        if next_id is not None:
+            result["nextId"] = int(next_id)
+        return 200, result
+
+    # --- batch changes ---
+
+    def discover_zone(self, input_name: str, record_type: str) -> Tuple[Optional[dict], str]:
+        """
+        Finds the zone for a batch change input, the zone with the longest name the fqdn falls in
+        :return: the zone, or None if there is none, and the fqdn
+        """
+        if record_type == "PTR":
+            try:
+                input_name = ipaddress.ip_address(input_name).reverse_pointer
+            except ValueError:
+                pass
+        fqdn = absolute(input_name)
+        candidates = [z for z in self.zones.values() if z["status"] == "Active"
+                      and (fqdn == z["name"] or fqdn.endswith("." + z["name"]))]
+        return max(candidates, key=lambda z: len(z["name"]), default=None), fqdn
+
+    def create_batch_change(self, user, body, **_):
+        changes = []
+        errors = False
+        for change in body["changes"]:
+            zone, fqdn = self.discover_zone(change["inputName"], change["type"])
+            if zone is None:
+                errors = True
+                changes.append(dict(change, errors=["Zone Discovery Failed: zone for \"{0}\" does not exist in "
+                                                    "VinylDNS.".format(change["inputName"])]))
+                continue
+            record_name = zone["name"] if fqdn == zone["name"] else fqdn[:-len(zone["name"]) - 1]
+            if ACCESS_LEVELS.index(self.access_level(user, zone, record_name, change["type"])) < 2:
+                errors = True
+                changes.append(dict(change, errors=["User \"{0}\" is not authorized. Contact zone owner group: {1} "
+                                                    "at {2} to make DNS changes."
+                                                    .format(user["userName"], zone["adminGroupId"], zone["email"])]))
+                continue
+            changes.append(dict(change, zoneId=zone["id"], zoneName=zone["name"], recordName=record_name,
+                                status="Pending", id=new_id()))
+
+        if errors:
+            return 400, [dict((k, v) for k, v in c.items() if k not in ("zoneId", "zoneName", "recordName", "status",
+                                                                         "id")) for c in changes]
+
+        batch_change = {"id": new_id(), "userId": user["id"], "userName": user["userName"],
+                        "comments": body.get("comments"), "createdTimestamp": now(), "changes": changes,
+                        "status": "PendingProcessing", "approvalStatus": "AutoApproved",
+                        "ownerGroupId": body.get("ownerGroupId")}
+        self.batch_changes[batch_change["id"]] = batch_change
+        self.batch_changes_remaining[batch_change["id"]] = len(changes)
+        for change in changes:
+            self.apply_batch_change(user, batch_change, change)
+        return 202, batch_change
+
+    def apply_batch_change(self, user: dict, batch_change: dict, change: dict) -> None:
+        zone = self.zones[change["zoneId"]]
+        existing = self.recordset_by_name(zone["id"], change["recordName"], change["type"])
+
+        if change["changeType"] == "Add":
+            records = [change["record"]] if "record" in change else []
+            if existing is not None:
+                recordset = dict(existing, records=existing["records"] + [r for r in records
+                                                                          if r not in existing["records"]])
+                change_type = "Update"
+            else:
+                recordset = {"name": change["recordName"], "type": change["type"], "ttl": change.get("ttl", 7200),
+                             "records": records, "zoneId": zone["id"], "id": new_id(), "created": now(),
+                             "account": "system", "ownerGroupId": batch_change.get("ownerGroupId"),
+                             "fqdn": self.fqdn(change["recordName"], zone)}
+                change_type = "Create"
+            apply = lambda: self.store_recordset(zone["id"], dict(recordset, status="Active"))
+        elif existing is not None and "record" in change and len(existing["records"]) > 1:
+            recordset = dict(existing, records=[r for r in existing["records"] if r != change["record"]])
+            change_type = "Update"
+            apply = lambda: self.store_recordset(zone["id"], dict(recordset, status="Active"))
+        elif existing is not None:
+            recordset = existing
+            change_type = "Delete"
+            apply = lambda: self.remove_recordset(zone["id"], recordset["id"])
+        else:
+            change["status"] = "Complete"
+            self.complete_batch_change(batch_change)
+            return
+
+        rs_change = self.recordset_change(user, zone, recordset, change_type, apply, batch_change["id"])
+        change["recordSetId"] = recordset["id"]
+        change["recordChangeId"] = rs_change["id"]
+
+        def complete():
+            with self.lock:
+                change["status"] = "Complete"
+                self.complete_batch_change(batch_change)
+
+        self.processor.submit(complete)
+
+    def complete_batch_change(self, batch_change: dict) -> None:
+        """
+        Counts one change of the batch as complete, and completes the batch with its last change
+        """
+        remaining = self.batch_changes_remaining[batch_change["id"]] - 1
+        self.batch_changes_remaining[batch_change["id"]] = remaining
+        if remaining == 0:
+            batch_change["status"] = "Complete"
+            del self.batch_changes_remaining[batch_change["id"]]
+
+    def get_batch_change(self, user, id, **_):
+        batch_change = self.batch_changes.get(id)
+        if batch_change is None:
+            raise ApiError(404, "Batch change with id {0} cannot be found".format(id))
+        self.require(batch_change["userId"] == user["id"] or self.is_admin(user),
+                     "User {0} does not have access to item {1}".format(user["userName"], id))
+        return 200, batch_change
+
+    def list_batch_change_summaries(self, user, query, **_):
+        ignore_access = query.get("ignoreAccess", "false").lower() == "true" and self.is_admin(user)
+        approval_status = query.get("approvalStatus")
+        max_items = int(query.get("maxItems", DEFAULT_MAX_ITEMS))
+        batch_changes = [b for b in self.batch_changes.values()
+                         if (ignore_access or b["userId"] == user["id"])
+                         and (approval_status is None or b["approvalStatus"] == approval_status)]
+        batch_changes.sort(key=lambda b: b["createdTimestamp"], reverse=True)
+        batch_changes, next_id = page(batch_changes, query.get("startFrom"), max_items)
+
+        summaries = [dict((k, v) for k, v in b.items() if k != "changes") for b in batch_changes]
+        for summary, batch_change in zip(summaries, batch_changes):
+            summary["totalChanges"] = len(batch_change["changes"])
+        result = {"batchChanges": summaries, "maxItems": max_items, "ignoreAccess": ignore_access}
+        if query.get("startFrom"):
+            result["startFrom"] = int(query["startFrom"])
+        if next_id is not None:
+            result["nextId"] = int(next_id)
+        if approval_status:
+            result["approvalStatus"] = approval_status
+        return 200, result
+
+    def review_batch_change(self, user, id, **_):
+        # batch changes are always auto-approved by the stand-in, so there is never anything to review
+        self.get_batch_change(user, id)
+        raise ApiError(400, "Batch change {0} is not pending review.".format(id))
+
+
+class StandInRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    wbufsize = -1
+
+    def handle_request(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        status, payload = self.server.api.handle(self.command, self.path, self.headers, body,
+                                                 self.headers.get("Host", ""))
+        if isinstance(payload, str):
+            content, content_type = payload.encode("utf-8"), "text/plain; charset=UTF-8"
+        else:
+            content, content_type = json.dumps(payload).encode("utf-8"), "application/json"
+
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = do_POST = do_PUT = do_DELETE = handle_request
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+class StandInServer(ThreadingHTTPServer):
+    """
+    Serves a `StandInApi`.  Use `start` to run it on a background thread, for example from a benchmark.
+    """
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.05,
+                 verify_signatures: bool = True):
+        super().__init__((host, port), StandInRequestHandler)
+        self.api = StandInApi(latency, verify_signatures)
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return "http://{0}:{1}/".format(host, port)
+
+    def start(self) -> "StandInServer":
+        self.thread = threading.Thread(target=self.serve_forever, name="stand-in-server", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+        self.api.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Runs an in-memory stand-in for the VinylDNS API")
+    parser.add_argument("--host", default="127.0.0.1", help="The address to listen on")
+    parser.add_argument("--port", type=int, default=9000, help="The port to listen on")
+    parser.add_argument("--latency", type=float, default=0.05,
+                        help="Seconds before a change is applied, like the API's asynchronous processing")
+    parser.add_argument("--no-verify-signatures", dest="verify_signatures", action="store_false",
+                        help="Accept any signature from a known access key, to take signature checks out of benchmarks")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    server = StandInServer(args.host, args.port, args.latency, args.verify_signatures)
+    logger.info("Serving a stand-in VinylDNS API on %s", server.url)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.api.close()
+
+
+if __name__ == "__main__":
+    main()
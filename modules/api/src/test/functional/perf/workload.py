@@ -0,0 +1,259 @@
+"""
+Test data for the benchmarks in this package: tenants (a user with a group and zones of their own), zones filled with
+many recordsets, clients that do not retry, and the status code of the last response each thread received.
+"""
+import logging
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, List, MutableMapping, Optional, Sequence, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from perf.stand_in_server import USERS
+from teardown_plan import TeardownPlan
+from utils import (create_recordset, get_change_A_AAAA_json, get_change_CNAME_json, get_change_TXT_json,
+                   get_group_json)
+from vinyldns_python import VinylDNSClient
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ZONE_SUFFIX = "load.test."
+
+# the batch change input for adding a recordset of each type zones are filled with, by fqdn
+FILL_CHANGES = {
+    "A": lambda fqdn: get_change_A_AAAA_json(fqdn, address="10.0.0.1"),
+    "AAAA": lambda fqdn: get_change_A_AAAA_json(fqdn, record_type="AAAA", address="fd00::1"),
+    "TXT": lambda fqdn: get_change_TXT_json(fqdn, text="fill"),
+    "CNAME": lambda fqdn: get_change_CNAME_json(fqdn, cname="fill.example.com.")
+}
+FILL_RECORD_TYPES = tuple(FILL_CHANGES)
+
+# the status code of the last response received on the current thread, see `last_status`
+responses = threading.local()
+
+
+def writable_users() -> List[dict]:
+    """
+    :return: the test users that can create groups and zones of their own
+    """
+    return [u for u in USERS if not u.get("locked")]
+
+
+def record_status(response, *args, **kwargs) -> None:
+    responses.status = response.status_code
+
+
+def last_status() -> Optional[int]:
+    """
+    :return: the status code of the last response a benchmark client received on this thread, then forgets it
+    """
+    status = getattr(responses, "status", None)
+    responses.status = None
+    return status
+
+
+def benchmark_client(url: str, user: dict, pool_size: int = 100) -> VinylDNSClient:
+    """
+    Creates a client for a benchmark.  Its requests are not retried, so errors and their latencies are measured as the
+    API returned them instead of being hidden behind the backoff of the functional test client, and the status of
+    each response is available from `last_status`.
+    """
+    client = VinylDNSClient(url, user["accessKey"], user["secretKey"])
+    client.tear_down()
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.hooks["response"].append(record_status)
+    client.session = client.session_not_found_ok = session
+    return client
+
+
+def open_loop(rate: float, duration: float, rng: random.Random, poisson: bool = True) -> Iterator[Tuple[float, float]]:
+    """
+    Paces arrivals on a fixed schedule, independent of how long the work for earlier arrivals takes: the caller hands
+    each arrival to other threads and measures its latency from the scheduled time, so a slow API shows up as latency
+    instead of as fewer arrivals (no "coordinated omission")
+    :param rate: arrivals per second
+    :param duration: the number of seconds to produce arrivals for
+    :param rng: draws the gaps between arrivals
+    :param poisson: true for exponentially distributed gaps, false for even gaps
+    :return: for each arrival, once it is due, its scheduled `time.perf_counter()` and its offset from the start
+    """
+    start = time.perf_counter()
+    offset = 0.0
+    while True:
+        offset += rng.expovariate(rate) if poisson else 1.0 / rate
+        if offset >= duration:
+            return
+        scheduled = start + offset
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        yield scheduled, offset
+
+
+class Tenant(object):
+    """
+    A user with a group and zones of their own, and a pool of the recordsets that were created in those zones and not
+    yet deleted, for benchmarks to pick from.  The pool is safe to use from many threads.
+    """
+
+    def __init__(self, user: dict, client: VinylDNSClient, prefix: str):
+        """
+        :param user: the user, from `writable_users`
+        :param client: a client for the user, from `benchmark_client`
+        :param prefix: the start of the names of the tenant's group and zones, unique to the tenant and the run
+        """
+        self.user = user
+        self.client = client
+        self.prefix = prefix
+        self.group: Optional[dict] = None
+        self.zones: List[dict] = []
+        self.recordsets: MutableMapping[str, List[dict]] = {}
+        self.lock = threading.Lock()
+
+    def add_recordset(self, recordset: dict) -> None:
+        with self.lock:
+            self.recordsets.setdefault(recordset["zoneId"], []).append(recordset)
+
+    def pick_recordset(self, zone_id: str, rng: random.Random) -> Optional[dict]:
+        with self.lock:
+            pool = self.recordsets.get(zone_id)
+            return rng.choice(pool) if pool else None
+
+    def take_recordset(self, zone_id: str, rng: random.Random) -> Optional[dict]:
+        """
+        Removes a random recordset from the pool, so it is not picked again once it is being deleted
+        """
+        with self.lock:
+            pool = self.recordsets.get(zone_id)
+            return pool.pop(rng.randrange(len(pool))) if pool else None
+
+
+def provision(url: str, users: List[dict], zones_per_user: int, records_per_zone: int = 0,
+              zone_suffix: str = DEFAULT_ZONE_SUFFIX, pool_size: int = 100, max_workers: int = 16) -> List[Tenant]:
+    """
+    Creates a group and zones for each user, and seeds each zone with A recordsets.  Against the real API, the zones
+    are only accepted if the backend serves them, so the suffix has to be a zone the name servers delegate.
+    :param url: the url of the API
+    :param users: the users, from `writable_users`
+    :param zones_per_user: the number of zones each user gets
+    :param records_per_zone: the number of recordsets to seed each zone with
+    :param zone_suffix: the domain the zones are created under
+    :param pool_size: the number of connections each tenant's client keeps open
+    :param max_workers: the number of threads creating the data
+    :return: the tenants
+    """
+    run_id = uuid.uuid4().hex[:8]
+    tenants = [Tenant(user, benchmark_client(url, user, pool_size), "perf-{0}-{1}".format(run_id, user["id"].lower()))
+               for user in users]
+
+    def create_group(tenant: Tenant) -> None:
+        user_ref = [{"id": tenant.user["id"]}]
+        tenant.group = tenant.client.create_group(get_group_json(tenant.prefix, members=user_ref, admins=user_ref),
+                                                  status=200)
+
+    def seed_recordset(tenant: Tenant, zone: dict, index: int) -> None:
+        recordset = create_recordset(zone, "seed-{0}".format(index), "A", [{"address": "10.0.0.1"}], ttl=300)
+        change = tenant.client.create_recordset(recordset, status=202)
+        tenant.client.wait_until_recordset_change_status(change, "Complete")
+        tenant.add_recordset(change["recordSet"])
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="provision") as executor:
+        for future in [executor.submit(create_group, t) for t in tenants]:
+            future.result()
+        add_zones(tenants, zones_per_user, zone_suffix, executor)
+        for future in [executor.submit(seed_recordset, t, z, i)
+                       for t in tenants for z in t.zones for i in range(records_per_zone)]:
+            future.result()
+
+    logger.info("Provisioned %d tenants with %d zones of %d recordsets each", len(tenants), zones_per_user,
+                records_per_zone)
+    return tenants
+
+
+def add_zones(tenants: List[Tenant], zones_per_tenant: int, zone_suffix: str = DEFAULT_ZONE_SUFFIX,
+              executor: Optional[ThreadPoolExecutor] = None) -> None:
+    """
+    Creates zones for each tenant until it has `zones_per_tenant` of them, and waits for them to become active
+    :param executor: runs the creation of the zones; by default a new one with 16 threads
+    """
+    def create_zone(tenant: Tenant, index: int) -> None:
+        name = "{0}-{1}.{2}".format(tenant.prefix, index, zone_suffix)
+        change = tenant.client.create_zone({"name": name, "email": "test@test.com",
+                                            "adminGroupId": tenant.group["id"]}, status=202)
+        tenant.client.wait_until_zone_active(change["zone"]["id"])
+        zone = tenant.client.get_zone(change["zone"]["id"], status=200)["zone"]
+        with tenant.lock:
+            tenant.zones.append(zone)
+
+    if executor is None:
+        with ThreadPoolExecutor(max_workers=16, thread_name_prefix="provision") as own_executor:
+            return add_zones(tenants, zones_per_tenant, zone_suffix, own_executor)
+    futures = [executor.submit(create_zone, t, i) for t in tenants for i in range(len(t.zones), zones_per_tenant)]
+    for future in futures:
+        future.result()
+
+
+def wait_for_batch_change(client: VinylDNSClient, batch_change: dict, timeout: float = 300.0,
+                          poll_interval: float = 0.1) -> dict:
+    """
+    Waits for a batch change to complete (or fail).  Unlike the client's own wait, the timeout is long enough for
+    batches of the size benchmarks fill zones with
+    :return: the completed batch change
+    """
+    deadline = time.monotonic() + timeout
+    while not client.batch_is_completed(batch_change):
+        if time.monotonic() > deadline:
+            raise TimeoutError("Batch change {0} did not complete in {1}s".format(batch_change["id"], timeout))
+        time.sleep(poll_interval)
+        latest = client.get_batch_change(batch_change["id"])
+        if isinstance(latest, dict):
+            batch_change = latest
+    return batch_change
+
+
+def fill_zone(client: VinylDNSClient, zone: dict, count: int, name_fn: Callable[[int], str],
+              record_types: Sequence[str] = FILL_RECORD_TYPES, batch_size: int = 1000, in_flight: int = 4) -> None:
+    """
+    Adds recordsets to a zone with batch changes, a few batches at a time
+    :param client: a client that can write to the zone
+    :param zone: the zone
+    :param count: the number of recordsets to add
+    :param name_fn: the record name of the recordset with the given index
+    :param record_types: the types to add, used in turn
+    :param batch_size: the number of changes per batch change, at most the API's batch change limit
+    :param in_flight: the number of batch changes to have pending at once
+    """
+    def add_batch(start: int) -> None:
+        changes = []
+        for index in range(start, min(start + batch_size, count)):
+            record_type = record_types[index % len(record_types)]
+            changes.append(FILL_CHANGES[record_type]("{0}.{1}".format(name_fn(index), zone["name"])))
+        batch_change = client.create_batch_change({"comments": "fill", "changes": changes},
+                                                  allow_manual_review=False, status=202)
+        batch_change = wait_for_batch_change(client, batch_change)
+        if batch_change["status"] != "Complete":
+            raise RuntimeError("Filling {0} failed: batch change {1} is {2}".format(zone["name"], batch_change["id"],
+                                                                                   batch_change["status"]))
+
+    with ThreadPoolExecutor(max_workers=in_flight, thread_name_prefix="fill") as executor:
+        for future in [executor.submit(add_batch, start) for start in range(0, count, batch_size)]:
+            future.result()
+    logger.info("Filled %s with %d recordsets", zone["name"], count)
+
+
+def tear_down(tenants: List[Tenant]) -> None:
+    """
+    Deletes the zones and groups of the tenants and closes their clients; failures are logged, not raised
+    """
+    plan = TeardownPlan()
+    for tenant in tenants:
+        plan.add_client(tenant.client)
+    plan.run()
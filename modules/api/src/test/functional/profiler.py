@@ -0,0 +1,218 @@
+import functools
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, List, MutableMapping, Optional, Tuple
+
+import pytest
+
+import utils
+from vinyldns_python import VinylDNSClient
+
+HTTP = "http"
+SIGNING = "signing"
+POLLING = "polling"
+DNS = "dns"
+LOCAL = "local"
+CATEGORIES = (HTTP, SIGNING, POLLING, DNS, LOCAL)
+
+DNS_HELPERS = ("dns_do_command", "dns_update", "dns_delete", "dns_add", "dns_resolve")
+
+
+class ProfilerPlugin(object):
+    """
+    Breaks the wall time of each test down into time spent making HTTP requests, signing them, polling (including
+    sleeping between polls), talking to the DNS server, and everything else (local work such as assertions).
+
+    The plugin wraps the client and helper functions while the tests run.  Each wrapper records its own time minus the
+    time of the wrapped calls made inside it, so a `wait_until_*` helper only accounts for its sleeps and bookkeeping,
+    not for the requests it makes.  Work done on helper threads is attributed to the test that started it.
+
+    Every worker writes its measurements to `profile_dir`; at the end of the session they are merged into a report
+    (`profile.txt`) and a collapsed-stack file (`profile.folded`) that flame graph tools can read.
+    """
+
+    def __init__(self, config, profile_dir: str):
+        self.config = config
+        self.profile_dir = profile_dir
+        self.worker_id = config.workerinput["workerid"] if hasattr(config, "workerinput") else "master"
+        self.current_test: Optional[str] = None
+        self.thread_local = threading.local()
+        self.lock = threading.Lock()
+        self.tests: MutableMapping[str, Counter] = {}
+        self.stacks: Counter = Counter()
+        self.patches: List[Tuple[Any, str, Any]] = []
+        self.report: Optional[str] = None
+
+    def profile(self, fn: Callable, category: str, name: str) -> Callable:
+        """
+        Wraps a function so the time spent in it is recorded against the current test
+        """
+        profiler = self
+
+        @functools.wraps(fn)
+        def profiled(*args, **kwargs):
+            test = profiler.current_test
+            if test is None:
+                return fn(*args, **kwargs)
+
+            stack = profiler.stack()
+            frame = [name, 0.0]
+            stack.append(frame)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                path = ";".join(f[0] for f in stack)
+                stack.pop()
+                if stack:
+                    stack[-1][1] += elapsed
+                profiler.record(test, category, path, elapsed - frame[1])
+
+        profiled.__profiled__ = fn
+        return profiled
+
+    def stack(self) -> List[list]:
+        if not hasattr(self.thread_local, "stack"):
+            self.thread_local.stack = []
+        return self.thread_local.stack
+
+    def record(self, test: str, category: str, path: str, seconds: float) -> None:
+        with self.lock:
+            self.tests.setdefault(test, Counter())[category] += seconds
+            self.stacks[test + ";" + path] += seconds
+
+    def install(self) -> None:
+        """
+        Wraps the profiled functions, including the references the test modules got from `from utils import *`
+        """
+        targets = [(VinylDNSClient, "make_request", HTTP), (VinylDNSClient, "sign_request", SIGNING),
+                   (time, "sleep", POLLING)]
+        targets += [(VinylDNSClient, name, POLLING) for name in dir(VinylDNSClient) if name.startswith("wait_until_")]
+        targets += [(utils, name, DNS) for name in DNS_HELPERS]
+        targets += [(utils, name, POLLING) for name in dir(utils) if name.startswith("wait_until_")]
+
+        root = os.path.dirname(os.path.abspath(__file__))
+        modules = [m for m in list(sys.modules.values())
+                   if m is not utils and os.path.abspath(getattr(m, "__file__", None) or "/").startswith(root)]
+
+        for owner, name, category in targets:
+            original = getattr(owner, name)
+            if hasattr(original, "__profiled__"):
+                continue
+            profiled = self.profile(original, category, name)
+            self.patch(owner, name, profiled)
+            if owner is utils:
+                for module in modules:
+                    if getattr(module, name, None) is original:
+                        self.patch(module, name, profiled)
+
+    def patch(self, owner: Any, name: str, value: Any) -> None:
+        self.patches.append((owner, name, owner.__dict__[name]))
+        setattr(owner, name, value)
+
+    def uninstall(self) -> None:
+        for owner, name, original in reversed(self.patches):
+            setattr(owner, name, original)
+        self.patches = []
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_protocol(self, item, nextitem):
+        self.current_test = item.nodeid
+        start = time.perf_counter()
+        yield
+        wall = time.perf_counter() - start
+        self.current_test = None
+
+        with self.lock:
+            totals = self.tests.setdefault(item.nodeid, Counter())
+            local = max(0.0, wall - sum(totals.values()))
+            totals[LOCAL] += local
+            self.stacks[item.nodeid + ";" + LOCAL] += local
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_sessionstart(self, session):
+        if self.worker_id == "master":
+            for path in glob.glob(os.path.join(self.profile_dir, "profile-*.*")):
+                os.remove(path)
+
+    def pytest_collection_finish(self, session):
+        self.install()
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_sessionfinish(self, session):
+        self.uninstall()
+        os.makedirs(self.profile_dir, exist_ok=True)
+        self.write_worker_files()
+        if self.worker_id == "master":
+            self.report = self.merge_worker_files()
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if self.report:
+            terminalreporter.write_sep("=", "test time breakdown")
+            terminalreporter.write(self.report)
+
+    def write_worker_files(self) -> None:
+        with open(os.path.join(self.profile_dir, "profile-{0}.json".format(self.worker_id)), "w") as f:
+            json.dump(self.tests, f)
+        with open(os.path.join(self.profile_dir, "profile-{0}.folded".format(self.worker_id)), "w") as f:
+            f.writelines(folded_lines(self.stacks))
+
+    def merge_worker_files(self) -> str:
+        """
+        Combines the measurements of every worker into the report and collapsed-stack files
+        :return: the report
+        """
+        tests = {}
+        for path in glob.glob(os.path.join(self.profile_dir, "profile-*.json")):
+            with open(path) as f:
+                tests.update((test, Counter(totals)) for test, totals in json.load(f).items())
+
+        with open(os.path.join(self.profile_dir, "profile.folded"), "w") as merged:
+            for path in sorted(glob.glob(os.path.join(self.profile_dir, "profile-*.folded"))):
+                with open(path) as f:
+                    merged.writelines(f)
+
+        report = format_report(tests)
+        with open(os.path.join(self.profile_dir, "profile.txt"), "w") as f:
+            f.write(report)
+        return report
+
+
+def folded_lines(stacks: Counter):
+    """
+    Renders stacks in the collapsed format (`frame;frame;frame value`), with values in microseconds
+    """
+    for path, seconds in sorted(stacks.items()):
+        micros = int(seconds * 1000000)
+        if micros > 0:
+            yield "{0} {1}\n".format(path.replace(" ", "_"), micros)
+
+
+def format_report(tests: MutableMapping[str, Counter], limit: int = 30) -> str:
+    """
+    Formats the total time per category across all tests, followed by the breakdown of the slowest tests
+    """
+    totals = Counter()
+    for breakdown in tests.values():
+        totals.update(breakdown)
+    wall = sum(totals.values()) or 1.0
+
+    lines = ["{0:<10}{1:>12}{2:>8}".format("category", "seconds", "%")]
+    for category in CATEGORIES:
+        lines.append("{0:<10}{1:>12.2f}{2:>7.1f}%".format(category, totals[category], 100 * totals[category] / wall))
+
+    lines.append("")
+    lines.append("slowest {0} tests:".format(min(limit, len(tests))))
+    lines.append("".join("{0:>9}".format(c) for c in ("total",) + CATEGORIES) + "  test")
+    slowest = sorted(tests.items(), key=lambda item: -sum(item[1].values()))[:limit]
+    for test, breakdown in slowest:
+        columns = [sum(breakdown.values())] + [breakdown[c] for c in CATEGORIES]
+        lines.append("".join("{0:>9.2f}".format(c) for c in columns) + "  " + test)
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,151 @@
+import ipaddress
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+from utils import get_change_PTR_json
+
+# This is set in the API service's configuration (batch-change-limit)
+BATCH_CHANGE_LIMIT = 1000
+
+# Lookup tables so that names are assembled from pre-rendered labels instead of formatting every address
+_OCTETS = [str(x) for x in range(256)]
+_HEX_BYTES = ["{0:02x}".format(x) for x in range(256)]
+_REVERSED_NIBBLES = ["{0:x}.{1:x}".format(x & 0xF, x >> 4) for x in range(256)]
+
+IPNetwork = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+
+def _network(cidr) -> IPNetwork:
+    return cidr if isinstance(cidr, (ipaddress.IPv4Network, ipaddress.IPv6Network)) \
+        else ipaddress.ip_network(cidr, strict=False)
+
+
+def classless_zone_name(cidr) -> str:
+    """
+    Gets the RFC 2317 delegated zone name for a classless IPv4 block, for example `192/30.2.0.192.in-addr.arpa.`
+    :param cidr: an IPv4 network with a prefix length between 25 and 31
+    :return: the zone name
+    """
+    network = _network(cidr)
+    if network.version != 4 or not 24 < network.prefixlen < 32:
+        raise ValueError("{0} is not a classless IPv4 block".format(network))
+
+    first = int(network.network_address)
+    return "{0}/{1}.{2}.{3}.{4}.in-addr.arpa.".format(first & 0xFF, network.prefixlen, _OCTETS[(first >> 8) & 0xFF],
+                                                      _OCTETS[(first >> 16) & 0xFF], _OCTETS[first >> 24])
+
+
+def reverse_name_blocks(cidr, classless: bool = False, limit: Optional[int] = None) \
+        -> Iterator[Tuple[List[str], List[str]]]:
+    """
+    Generates the addresses in a network along with their reverse names, a block of up to 256 addresses at a time.
+    Each block shares everything but its last byte, so the common suffix of the names is built once per block
+    and the varying labels come from lookup tables.
+
+    IPv6 addresses are rendered in their exploded form, which the API accepts as a batch change input name.
+
+    :param cidr: the network, e.g. `10.1.0.0/16` or `fd69:27cc:fe91::/112`
+    :param classless: if true, name IPv4 records inside the RFC 2317 delegation for the network,
+                      e.g. `193.192/30.2.0.192.in-addr.arpa.`
+    :param limit: the maximum number of addresses to generate; needed for IPv6 blocks that are too large to enumerate
+    :return: an iterator of (addresses, reverse fqdns) tuples
+    """
+    network = _network(cidr)
+    first = int(network.network_address)
+    remaining = network.num_addresses if limit is None else min(limit, network.num_addresses)
+
+    if classless:
+        classless_suffix = "." + classless_zone_name(network)
+
+    block_start = first
+    while remaining > 0:
+        low = block_start & 0xFF
+        count = min(256 - low, remaining)
+        high = block_start >> 8
+
+        if network.version == 4:
+            ip_prefix = "{0}.{1}.{2}.".format(_OCTETS[high >> 16], _OCTETS[(high >> 8) & 0xFF], _OCTETS[high & 0xFF])
+            if classless:
+                name_suffix = classless_suffix
+            else:
+                name_suffix = ".{0}.{1}.{2}.in-addr.arpa.".format(_OCTETS[high & 0xFF], _OCTETS[(high >> 8) & 0xFF],
+                                                                   _OCTETS[high >> 16])
+            addresses = [ip_prefix + _OCTETS[x] for x in range(low, low + count)]
+            names = [_OCTETS[x] + name_suffix for x in range(low, low + count)]
+        else:
+            exploded = ipaddress.IPv6Address(block_start).exploded
+            ip_prefix = exploded[:-2]
+            upper = "{0:030x}".format(high)
+            name_suffix = "." + ".".join(reversed(upper)) + ".ip6.arpa."
+            addresses = [ip_prefix + _HEX_BYTES[x] for x in range(low, low + count)]
+            names = [_REVERSED_NIBBLES[x] + name_suffix for x in range(low, low + count)]
+
+        yield addresses, names
+        remaining -= count
+        block_start += count
+
+
+def reverse_names(cidrs: Iterable, zone_name: Optional[str] = None, classless: bool = False,
+                  limit: Optional[int] = None) -> Iterator[Tuple[str, str]]:
+    """
+    Generates the reverse names for every address in the given networks
+    :param cidrs: the networks to generate names for
+    :param zone_name: if provided, names are returned relative to this reverse zone, as used for recordset names
+    :param classless: if true, name IPv4 records inside the RFC 2317 delegation for each network
+    :param limit: the maximum number of addresses to generate per network
+    :return: an iterator of (address, reverse name) tuples
+    """
+    strip = len(zone_name) + 1 if zone_name else 0
+    for cidr in cidrs:
+        for addresses, names in reverse_name_blocks(cidr, classless, limit):
+            if strip:
+                names = [name[:-strip] for name in names]
+            yield from zip(addresses, names)
+
+
+def ptr_changes(cidrs: Iterable, ptrdname: str = "test.com.", ttl: int = 200, change_type: str = "Add",
+                limit: Optional[int] = None) -> Iterator[dict]:
+    """
+    Generates a PTR batch change input for every address in the given networks
+    :param cidrs: the networks to generate changes for
+    :param ptrdname: the ptrdname of each record; may reference `{ip}` and `{index}` to make them distinct
+    :param ttl: the ttl of each record
+    :param change_type: the batch change type, e.g. `Add` or `DeleteRecordSet`
+    :param limit: the maximum number of addresses to generate per network
+    :return: an iterator of single change inputs
+    """
+    templated = "{" in ptrdname
+    index = 0
+    for cidr in cidrs:
+        for addresses, _ in reverse_name_blocks(cidr, limit=limit):
+            for address in addresses:
+                name = ptrdname.format(ip=address, index=index) if templated else ptrdname
+                yield get_change_PTR_json(address, ttl=ttl, ptrdname=name, change_type=change_type)
+                index += 1
+
+
+def ptr_batch_changes(cidrs: Iterable, chunk_size: int = BATCH_CHANGE_LIMIT, comments: Optional[str] = None,
+                      **kwargs) -> Iterator[dict]:
+    """
+    Groups the PTR changes for the given networks into batch change inputs no larger than the batch change limit
+    :param cidrs: the networks to generate changes for
+    :param chunk_size: the maximum number of changes in a single batch change
+    :param comments: optional comments for each batch change
+    :param kwargs: passed through to `ptr_changes`
+    :return: an iterator of batch change inputs ready for `create_batch_change`
+    """
+    changes = []
+    for change in ptr_changes(cidrs, **kwargs):
+        changes.append(change)
+        if len(changes) == chunk_size:
+            yield _batch_change_input(changes, comments)
+            changes = []
+
+    if changes:
+        yield _batch_change_input(changes, comments)
+
+
+def _batch_change_input(changes: List[dict], comments: Optional[str]) -> dict:
+    batch_change_input = {"changes": changes}
+    if comments is not None:
+        batch_change_input["comments"] = comments
+    return batch_change_input
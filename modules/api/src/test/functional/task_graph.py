@@ -0,0 +1,122 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Iterable, MutableMapping, Optional, Sequence, Tuple
+
+DEFAULT_MAX_WORKERS = 16
+
+
+class TaskGraph(object):
+    """
+    Runs named tasks on a thread pool as soon as the tasks they depend on have finished.
+
+    Each task runs at most once; its result is kept so that asking for it again (or asking for something that depends
+    on it) does not run it a second time.  A task whose dependency failed is not run and fails with the same error.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS):
+        self.tasks: MutableMapping[str, Tuple[Callable[[], Any], Sequence[str]]] = {}
+        self.futures: MutableMapping[str, Future] = {}
+        self.lock = threading.RLock()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="task-graph")
+
+    def add(self, name: str, fn: Callable[[], Any], depends_on: Iterable[str] = ()) -> None:
+        """
+        Registers a task
+        :param name: the unique name of the task
+        :param fn: the function to run, taking no arguments
+        :param depends_on: the names of the tasks that must finish successfully before this one starts
+        """
+        with self.lock:
+            if name in self.tasks:
+                raise ValueError(f"Task {name} is already defined")
+            self.tasks[name] = (fn, tuple(depends_on))
+
+    def submit(self, name: str) -> Future:
+        """
+        Schedules a task and, transitively, everything it depends on
+        :param name: the name of the task
+        :return: the future for the result of the task
+        """
+        with self.lock:
+            if name in self.futures:
+                return self.futures[name]
+            fn, depends_on = self.tasks[name]
+            future = self.futures[name] = Future()
+            dependencies = [self.submit(dependency) for dependency in depends_on]
+
+        remaining = [len(dependencies)]
+
+        def on_dependency_done(_):
+            with self.lock:
+                remaining[0] -= 1
+                ready = remaining[0] == 0
+            if ready:
+                self._start(fn, dependencies, future)
+
+        if not dependencies:
+            self._start(fn, dependencies, future)
+        for dependency in dependencies:
+            dependency.add_done_callback(on_dependency_done)
+
+        return future
+
+    def _start(self, fn: Callable[[], Any], dependencies: Sequence[Future], future: Future) -> None:
+        failed = next((d.exception() for d in dependencies if d.exception() is not None), None)
+        if failed is not None:
+            future.set_exception(failed)
+            return
+
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(fn())
+            except BaseException as e:
+                future.set_exception(e)
+
+        self.executor.submit(run)
+
+    def result(self, name: str) -> Any:
+        """
+        Runs a task if it has not been run yet and waits for its result
+        """
+        return self.submit(name).result()
+
+    def set_result(self, name: str, result: Any = None) -> None:
+        """
+        Marks a task as done without running it, e.g. when its result was restored from an earlier run
+        """
+        with self.lock:
+            future = Future()
+            future.set_result(result)
+            self.futures[name] = future
+
+    def is_done(self, name: str) -> bool:
+        with self.lock:
+            return name in self.futures and self.futures[name].done()
+
+    def succeeded(self, name: str) -> bool:
+        with self.lock:
+            return self.is_done(name) and self.futures[name].exception() is None
+
+    def run(self, names: Optional[Iterable[str]] = None) -> None:
+        """
+        Runs the given tasks (by default all of them) and waits for everything that was scheduled to finish
+        :raises: the first error raised by any of the tasks
+        """
+        futures = [self.submit(name) for name in (list(self.tasks) if names is None else names)]
+        self.wait()
+        for future in futures:
+            if future.exception() is not None:
+                raise future.exception()
+
+    def wait(self) -> None:
+        """
+        Waits for everything that was scheduled to finish, without raising the errors of failed tasks
+        """
+        with self.lock:
+            scheduled = list(self.futures.values())
+        wait(scheduled)
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True)
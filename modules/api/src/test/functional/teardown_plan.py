@@ -0,0 +1,97 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, MutableMapping, Sequence, Tuple
+
+from vinyldns_python import VinylDNSClient
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 16
+
+# Each tier can only be deleted once everything in the tiers before it is gone: a zone cannot be deleted while a
+# deletion of one of its recordsets is in flight, and a group cannot be deleted while it is the admin of a zone
+RECORDSETS = "recordsets"
+ZONES = "zones"
+GROUPS = "groups"
+CLIENTS = "clients"
+TIERS = [RECORDSETS, ZONES, GROUPS, CLIENTS]
+
+
+class TeardownError(Exception):
+    """
+    Raised after a teardown in which some objects could not be deleted
+    """
+
+    def __init__(self, failures: Sequence[Tuple[str, BaseException]]):
+        super().__init__("Teardown failed for {0} object(s): {1}".format(
+            len(failures), "; ".join("{0}: {1!r}".format(name, error) for name, error in failures)))
+        self.failures = failures
+
+
+class TeardownPlan(object):
+    """
+    Deletes everything the test clients created, tier by tier (recordsets, then zones, then groups, then closing the
+    clients), with the work inside a tier done concurrently.  A failure is recorded and does not stop the rest of the
+    teardown, so one stuck zone does not leave everything else behind.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS):
+        self.max_workers = max_workers
+        self.tasks: MutableMapping[str, MutableMapping[str, Callable[[], None]]] = dict((tier, {}) for tier in TIERS)
+
+    def add(self, tier: str, name: str, fn: Callable[[], None]) -> None:
+        """
+        Adds a step to a tier; a step with the same name as one already planned is ignored
+        """
+        self.tasks[tier].setdefault(name, fn)
+
+    def planned(self, tier: str, name: str) -> bool:
+        return name in self.tasks[tier]
+
+    def delete_recordset(self, client: VinylDNSClient, zone_id: str, recordset_id: str) -> None:
+        def delete():
+            change = client.delete_recordset(zone_id, recordset_id, status=(202, 404))
+            if type(change) != str:
+                client.wait_until_recordset_change_status(change, "Complete")
+
+        self.add(RECORDSETS, "recordset {0} in zone {1}".format(recordset_id, zone_id), delete)
+
+    def delete_zone(self, client: VinylDNSClient, zone_id: str) -> None:
+        def delete():
+            change = client.delete_zone(zone_id, status=(202, 404))
+            if type(change) != str:
+                client.wait_until_zone_deleted(zone_id)
+
+        self.add(ZONES, "zone {0}".format(zone_id), delete)
+
+    def delete_group(self, client: VinylDNSClient, group_id: str) -> None:
+        self.add(GROUPS, "group {0}".format(group_id), lambda: client.delete_group(group_id, status=(200, 404)))
+
+    def close_client(self, client: VinylDNSClient) -> None:
+        self.add(CLIENTS, "client {0}".format(id(client)), client.tear_down)
+
+    def add_client(self, client: VinylDNSClient) -> None:
+        """
+        Plans the deletion of every zone and group the client created, and closing the client
+        """
+        for zone_id in client.created_zones:
+            self.delete_zone(client, zone_id)
+        for group_id in client.created_groups:
+            self.delete_group(client, group_id)
+        self.close_client(client)
+
+    def run(self) -> List[Tuple[str, BaseException]]:
+        """
+        Runs the plan
+        :return: the steps that failed, with their errors
+        """
+        failures = []
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="teardown") as executor:
+            for tier in TIERS:
+                steps = list(self.tasks[tier].items())
+                futures = [executor.submit(fn) for _, fn in steps]
+                for (name, _), future in zip(steps, futures):
+                    if future.exception() is not None:
+                        logger.error("Teardown of %s failed: %r", name, future.exception())
+                        failures.append((name, future.exception()))
+        return failures
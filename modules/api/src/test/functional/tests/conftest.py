@@ -1,20 +1,40 @@
 import logging
-from pathlib import Path
-from typing import MutableMapping
+import re
+from contextlib import ExitStack
+from typing import List, MutableMapping, Set
 
 import pytest
-
+from context_usage import ContextUsage
+from partition_pool import PartitionPool, provision_context, save_snapshot
+from read_write_lock import ReadWriteFileLock
 from shared_zone_test_context import SharedZoneTestContext
-
-STATE_FILE = Path("testing_state.json")
+from teardown_plan import TeardownError
+from utils import dns_answer_cache
+from vinyldns_context import VinylDNSTestContext
 
 logger = logging.getLogger(__name__)
 
 ctx_cache: MutableMapping[str, SharedZoneTestContext] = {}
+partition_pool: MutableMapping[str, PartitionPool] = {}
+# global state the tests depend on; tests marked with `resource_lock` on one of these change it
+GLOBAL_RESOURCES = ["processing_status"]
+# the lazy attributes of the shared context that the selected tests read, see `pytest_collection_modifyitems`
+prefetch_attributes: Set[str] = set()
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_collection_modifyitems(session, config, items):
+    """
+    Works out which zones, groups and list contexts the selected tests need, so the shared context can start
+    provisioning them as soon as it is created instead of when each test first reads them
+    """
+    prefetch_attributes.clear()
+    prefetch_attributes.update(ContextUsage(set(SharedZoneTestContext.provisioned_attributes())).of_items(items))
+    logger.debug("Prefetching %s", sorted(prefetch_attributes))
 
 
 @pytest.fixture(scope="session")
-def shared_zone_test_context(tmp_path_factory, worker_id):
+def shared_zone_test_context(request, tmp_path_factory, worker_id):
     if worker_id == "master":
         partition_id = "1"
     else:
@@ -23,15 +43,95 @@ def shared_zone_test_context(tmp_path_factory, worker_id):
     if ctx_cache.get(partition_id) is not None:
         return ctx_cache[partition_id]
 
-    ctx = ctx_cache[partition_id] = SharedZoneTestContext(partition_id)
-    ctx.setup()
+    if request.config.getoption("partition_pool"):
+        pool = PartitionPool(int(request.config.getoption("partitions")),
+                             float(request.config.getoption("partition_lease_timeout")))
+        ctx = pool.acquire(partition_id)
+        partition_pool[ctx.partition_id] = pool
+    else:
+        ctx = provision_context(partition_id, keep=not VinylDNSTestContext.teardown)
+    ctx.prefetch(prefetch_attributes)
+
+    ctx_cache[partition_id] = ctx
     yield ctx
-    del ctx_cache[partition_id]
-    ctx.tear_down()
+    # the context is only still cached if it was not already returned by `pytest_keyboard_interrupt`
+    if ctx_cache.pop(partition_id, None) is not None:
+        return_context(ctx)
+
+
+def return_context(ctx: SharedZoneTestContext) -> None:
+    """
+    Hands a context back to its pool, saves it for another run, or tears it down, depending on the options
+    """
+    pool = partition_pool.pop(ctx.partition_id, None)
+    if pool is not None:
+        pool.give_back(ctx)
+    elif VinylDNSTestContext.teardown:
+        ctx.tear_down()
+        save_snapshot(ctx.partition_id, None)
+    else:
+        ctx.discard_test_objects()
+        save_snapshot(ctx.partition_id, ctx.snapshot())
+        ctx.close()
+
+
+def resource_lock_names(request) -> List[str]:
+    """
+    Gets the resources named by the `resource_lock` marks on a test, in the order they must be locked
+    """
+    names = set(name for marker in request.node.iter_markers("resource_lock") for name in marker.args)
+
+    # always lock in the same order so two tests wanting the same resources cannot deadlock
+    return sorted(names)
+
+
+def resource_lock_file(lock_dir, name: str) -> str:
+    return str(lock_dir / "{0}.lock".format(re.sub(r"[^\w.-]", "_", name)))
+
+
+@pytest.fixture(autouse=True)
+def resource_locks(request, tmp_path_factory):
+    """
+    Holds the locks for the resources used by the test while it runs.  The locks live in the base temp directory
+    shared by all xdist workers.
+
+    The resources named by the test's `resource_lock` marks are locked exclusively.  Global state that every test
+    depends on (`GLOBAL_RESOURCES`) is locked shared by every other test, so a test that changes it waits for the
+    running tests to finish and holds back the others until it is done.
+    """
+    exclusive = resource_lock_names(request)
+    locks = sorted([(name, False) for name in exclusive] +
+                   [(name, True) for name in GLOBAL_RESOURCES if name not in exclusive])
+
+    lock_dir = tmp_path_factory.getbasetemp().parent / "resource_locks"
+    lock_dir.mkdir(exist_ok=True)
+    timeout = float(request.config.getoption("resource_lock_timeout"))
+    with ExitStack() as stack:
+        for name, shared in locks:
+            lock = ReadWriteFileLock(resource_lock_file(lock_dir, name))
+            lock.acquire(shared, timeout)
+            stack.callback(lock.release)
+        yield
+
+
+@pytest.fixture(autouse=True)
+def fresh_dns_answers():
+    """
+    Starts every test with an empty dns answer cache, so an answer never outlives the test that cached it
+    """
+    dns_answer_cache.clear()
+    yield
 
 
 @pytest.hookimpl(tryfirst=True)
 def pytest_keyboard_interrupt():
     print("cleaning up state due to interrupt")
-    for partition_id, context in ctx_cache.items():
-        context.tear_down()
+    for partition_id in list(ctx_cache):
+        # nothing may escape the hook: the rest of the contexts still need to be cleaned up
+        try:
+            return_context(ctx_cache.pop(partition_id))
+        except TeardownError as e:
+            for name, error in e.failures:
+                logger.error("Partition %s: could not clean up %s: %r", partition_id, name, error)
+        except Exception:
+            logger.exception("Partition %s could not be cleaned up", partition_id)
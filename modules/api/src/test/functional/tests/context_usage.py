@@ -0,0 +1,107 @@
+import ast
+import inspect
+import logging
+import os
+import textwrap
+from typing import AbstractSet, Callable, FrozenSet, Iterable, MutableMapping, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class ContextUsage(object):
+    """
+    Finds the shared context attributes a set of tests reads, by scanning the source of each test, of the fixtures it
+    uses, and of the functional test helpers (e.g. in `utils`) they hand the context to.
+
+    Only reads from the context fixture count: `shared_zone_test_context.ok_zone`, `getattr(shared_zone_test_context,
+    "ok_zone")`, and the same through a local name the context was assigned to or a helper parameter it was passed
+    as.  The scan is a best guess and only follows calls made by name; anything it misses is still provisioned when
+    the test reads it, it is only not started ahead of time.
+    """
+
+    def __init__(self, attributes: AbstractSet[str], fixture_name: str = "shared_zone_test_context"):
+        """
+        :param attributes: the attribute names to look for
+        :param fixture_name: the name of the fixture that provides the context
+        """
+        self.attributes = attributes
+        self.fixture_name = fixture_name
+        self.scanned: MutableMapping[Tuple[object, FrozenSet[str]], Set[str]] = {}
+
+    def of_items(self, items: Iterable) -> Set[str]:
+        """
+        :param items: the collected pytest items
+        :return: the attributes read by any of them
+        """
+        used = set()
+        for item in items:
+            functions = [getattr(item, "function", None)]
+            fixture_info = getattr(item, "_fixtureinfo", None)
+            if fixture_info is not None:
+                functions += [fixture_def.func for fixture_defs in fixture_info.name2fixturedefs.values()
+                              for fixture_def in fixture_defs]
+            for fn in functions:
+                if fn is not None:
+                    used |= self.of_function(fn, frozenset([self.fixture_name]))
+        return used
+
+    def of_function(self, fn: Callable, context_names: FrozenSet[str]) -> Set[str]:
+        """
+        :param fn: the function to scan
+        :param context_names: the names of the function's parameters that hold the context
+        :return: the attributes the function, or the test helpers it passes the context to, read from the context
+        """
+        fn = inspect.unwrap(fn)
+        code = getattr(fn, "__code__", None)
+        if code is None or not context_names & set(code.co_varnames):
+            return set()
+        if (code, context_names) in self.scanned:
+            return self.scanned[(code, context_names)]
+
+        # mark the function before following its calls, so recursive helpers terminate
+        used = self.scanned[(code, context_names)] = set()
+        try:
+            tree = ast.parse(textwrap.dedent(inspect.getsource(fn)))
+        except (OSError, TypeError, SyntaxError):
+            logger.debug("Cannot scan the source of %r", fn)
+            return used
+
+        names = set(context_names)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Assign) and self.is_context(node.value, names):
+                names.update(target.id for target in node.targets if isinstance(target, ast.Name))
+
+        module_globals = getattr(fn, "__globals__", {})
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Attribute) and node.attr in self.attributes and self.is_context(node.value, names):
+                used.add(node.attr)
+            elif isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+                if node.func.id == "getattr" and len(node.args) >= 2 and self.is_context(node.args[0], names) \
+                        and isinstance(node.args[1], ast.Constant) and node.args[1].value in self.attributes:
+                    used.add(node.args[1].value)
+                    continue
+
+                callee = module_globals.get(node.func.id)
+                if inspect.isfunction(callee) and os.path.abspath(callee.__code__.co_filename).startswith(ROOT):
+                    parameters = self.context_parameters(callee, node, names)
+                    if parameters:
+                        used |= self.of_function(callee, parameters)
+        return used
+
+    @staticmethod
+    def is_context(node: ast.AST, names: AbstractSet[str]) -> bool:
+        return isinstance(node, ast.Name) and node.id in names
+
+    def context_parameters(self, callee: Callable, call: ast.Call, names: AbstractSet[str]) -> FrozenSet[str]:
+        """
+        :return: the parameters of `callee` that receive the context in `call`
+        """
+        code = callee.__code__
+        positional = code.co_varnames[:code.co_argcount]
+        parameters = set(positional[i] for i, arg in enumerate(call.args)
+                         if i < len(positional) and self.is_context(arg, names))
+        parameters.update(keyword.arg for keyword in call.keywords
+                          if keyword.arg is not None and self.is_context(keyword.value, names))
+        return frozenset(parameters)
@@ -38,6 +38,7 @@ def test_post_status_fails_for_non_users(shared_zone_test_context):
     assert_that(result, is_("Authentication Failed: Account with accessKey not-exist-key specified was not found"))
 
 
+@pytest.mark.resource_lock("processing_status")
 def test_post_status_pass_for_admin_users(shared_zone_test_context):
     """
     Tests that the post request to status endpoint pass for admin users
@@ -57,6 +58,7 @@ def test_post_status_pass_for_admin_users(shared_zone_test_context):
 
 @pytest.mark.serial
 @pytest.mark.skip_production
+@pytest.mark.resource_lock("processing_status")
 def test_toggle_processing(shared_zone_test_context):
     """
     Test that updating a zone when processing is disabled does not happen
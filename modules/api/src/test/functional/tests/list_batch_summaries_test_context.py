@@ -1,5 +1,6 @@
 from pathlib import Path
 
+from teardown_plan import RECORDSETS, ZONES, TeardownPlan
 from utils import *
 from vinyldns_python import VinylDNSClient
 
@@ -79,6 +80,23 @@ class ListBatchChangeSummariesTestContext:
         self.client.clear_groups()
         self.client.tear_down()
 
+    def plan_tear_down(self, plan: TeardownPlan, shared_zone_test_context):
+        """
+        Adds the cleanup of this context to the shared context's teardown plan.  Records and acl rules in zones that
+        are being deleted anyway are left to go with the zone.
+        """
+        client = shared_zone_test_context.ok_vinyldns_client
+        for zone_id, recordset_id in self.to_delete:
+            if not plan.planned(ZONES, "zone {0}".format(zone_id)):
+                plan.delete_recordset(client, zone_id, recordset_id)
+        self.to_delete = set()
+
+        ok_zone = shared_zone_test_context.peek("ok_zone")
+        if ok_zone is not None and not plan.planned(ZONES, "zone {0}".format(ok_zone["id"])):
+            plan.add(RECORDSETS, "acl rules of zone {0}".format(ok_zone["id"]),
+                     lambda: clear_ok_acl_rules(shared_zone_test_context))
+        plan.close_client(self.client)
+
     def check_batch_change_summaries_page_accuracy(self, summaries_page, size, next_id=False, start_from=False, max_items=100, approval_status=False):
         # validate fields
         if next_id:
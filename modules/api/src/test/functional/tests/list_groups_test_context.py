@@ -1,3 +1,5 @@
+from concurrent.futures import ThreadPoolExecutor
+
 from utils import *
 from vinyldns_python import VinylDNSClient
 
@@ -16,14 +18,14 @@ class ListGroupsTestContext(object):
             return
         self.setup_started = True
         try:
-            for index in range(0, 50):
-                new_group = {
-                    "name": "{0}-{1:0>3}".format(self.group_prefix, index),
-                    "email": "test@test.com",
-                    "members": [{"id": "list-group-user"}],
-                    "admins": [{"id": "list-group-user"}]
-                }
-                self.client.create_group(new_group, status=200)
+            new_groups = [{
+                "name": "{0}-{1:0>3}".format(self.group_prefix, index),
+                "email": "test@test.com",
+                "members": [{"id": "list-group-user"}],
+                "admins": [{"id": "list-group-user"}]
+            } for index in range(0, 50)]
+            with ThreadPoolExecutor(max_workers=10) as executor:
+                list(executor.map(lambda new_group: self.client.create_group(new_group, status=200), new_groups))
         except Exception:
             self.tear_down()
             traceback.print_exc()
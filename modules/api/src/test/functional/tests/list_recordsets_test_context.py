@@ -3,6 +3,8 @@ from vinyldns_python import VinylDNSClient
 
 
 class ListRecordSetsTestContext(object):
+    SNAPSHOT_ATTRIBUTES = ["zone", "all_records", "group"]
+
     def __init__(self, partition_id: str):
         self.partition_id = partition_id
         self.setup_started = False
@@ -3,6 +3,9 @@ from vinyldns_python import VinylDNSClient
 
 
 class ListZonesTestContext(object):
+    SNAPSHOT_ATTRIBUTES = ["search_zone1", "search_zone2", "search_zone3", "non_search_zone1", "non_search_zone2",
+                           "list_zones_group"]
+
     def __init__(self, partition_id):
         self.partition_id = partition_id
         self.setup_started = False
@@ -86,8 +89,7 @@ class ListZonesTestContext(object):
         self.non_search_zone2 = non_search_zone_2_change["zone"]
 
         zone_changes = [search_zone_1_change, search_zone_2_change, search_zone_3_change, non_search_zone_1_change, non_search_zone_2_change]
-        for change in zone_changes:
-            self.client.wait_until_zone_active(change["zone"]["id"])
+        self.client.wait_until_zones_active([change["zone"]["id"] for change in zone_changes])
 
     def tear_down(self):
         self.client.clear_zones()
@@ -0,0 +1,158 @@
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Mapping, MutableMapping, Optional
+
+from filelock import FileLock, Timeout
+
+from shared_zone_test_context import SharedZoneTestContext
+
+STATE_FILE = Path("testing_state.json")
+
+logger = logging.getLogger(__name__)
+
+
+def load_snapshot(partition_id: str) -> Optional[Mapping]:
+    """
+    Loads the snapshot of a partition's shared context left by a previous run
+    """
+    with FileLock(str(STATE_FILE) + ".lock"):
+        if not STATE_FILE.exists():
+            return None
+        try:
+            return json.loads(STATE_FILE.read_text()).get(partition_id)
+        except ValueError:
+            logger.warning("Ignoring unreadable state file %s", STATE_FILE)
+            return None
+
+
+def save_snapshot(partition_id: str, snapshot: Optional[Mapping]) -> None:
+    """
+    Saves (or, when `snapshot` is None, removes) the snapshot of a partition's shared context.  Workers share the
+    state file, so it is updated under a lock.
+    """
+    with FileLock(str(STATE_FILE) + ".lock"):
+        state = {}
+        if STATE_FILE.exists():
+            try:
+                state = json.loads(STATE_FILE.read_text())
+            except ValueError:
+                logger.warning("Overwriting unreadable state file %s", STATE_FILE)
+
+        if snapshot is None:
+            state.pop(partition_id, None)
+        else:
+            state[partition_id] = snapshot
+
+        if state:
+            STATE_FILE.write_text(json.dumps(state, indent=2))
+        elif STATE_FILE.exists():
+            STATE_FILE.unlink()
+
+
+def provision_context(partition_id: str, keep: bool = False) -> SharedZoneTestContext:
+    """
+    Reuses the shared context saved by a previous run if it is still intact; otherwise cleans up whatever is left
+    of it and starts a new one, whose zones and groups are provisioned as the tests use them
+    :param partition_id: the partition to provision
+    :param keep: true if the context will be saved for another run, in which case its baseline is captured
+    """
+    snapshot = load_snapshot(partition_id)
+    if snapshot is not None:
+        ctx = SharedZoneTestContext(partition_id)
+        if ctx.restore(snapshot):
+            logger.info("Restored shared context for partition %s from %s", partition_id, STATE_FILE)
+            return ctx
+        ctx.tear_down()
+        save_snapshot(partition_id, None)
+
+    ctx = SharedZoneTestContext(partition_id)
+    if keep:
+        ctx.track_baseline()
+    return ctx
+
+
+class PartitionPool(object):
+    """
+    Leases partitions (the per-partition zone sets configured in bind9) to xdist workers.
+
+    A partition is leased by holding its lock file, so any worker can take any free partition rather than the one
+    matching its worker number.  Partitions are provisioned the first time they are leased and are kept in the
+    state file afterwards; when a lease ends the partition is reset to its baseline and saved, so the next lease,
+    in this session or a later one, starts without provisioning.  A lease lasts for the worker's whole session, so a
+    session cannot run more workers than there are partitions (this is rejected at startup); a worker only waits
+    when another session running at the same time holds the partitions.
+    """
+
+    def __init__(self, size: int, lease_timeout: float = 600, poll_interval: float = 0.5):
+        self.size = size
+        self.lease_timeout = lease_timeout
+        self.poll_interval = poll_interval
+        self.leases: MutableMapping[str, FileLock] = {}
+
+    def lock_file(self, partition_id: str) -> str:
+        return "{0}.partition{1}.lock".format(STATE_FILE, partition_id)
+
+    def candidates(self, preferred: str):
+        """
+        Partitions in the order a worker should try them: its own first, then provisioned ones, then the rest
+        """
+        partition_ids = [str(x) for x in range(1, self.size + 1)]
+        provisioned = set(p for p in partition_ids if load_snapshot(p) is not None)
+        return sorted(partition_ids, key=lambda p: (p != preferred, p not in provisioned, int(p)))
+
+    def lease(self, preferred: str) -> str:
+        """
+        Waits for a free partition and takes it
+        :param preferred: the partition to try first
+        :return: the leased partition id
+        """
+        deadline = time.monotonic() + self.lease_timeout
+        while True:
+            for partition_id in self.candidates(preferred):
+                lock = FileLock(self.lock_file(partition_id))
+                try:
+                    lock.acquire(timeout=0)
+                except Timeout:
+                    continue
+                self.leases[partition_id] = lock
+                logger.info("Leased partition %s", partition_id)
+                return partition_id
+
+            if time.monotonic() > deadline:
+                raise Timeout(self.lock_file(preferred))
+            time.sleep(self.poll_interval)
+
+    def acquire(self, preferred: str) -> SharedZoneTestContext:
+        """
+        Leases a partition and returns its shared context, provisioning it only if it is not in the pool yet
+        """
+        partition_id = self.lease(preferred)
+        try:
+            return provision_context(partition_id, keep=True)
+        except Exception:
+            self.release(partition_id)
+            raise
+
+    def give_back(self, ctx: SharedZoneTestContext) -> None:
+        """
+        Resets a leased context to its baseline and returns it to the pool.  A context that cannot be reset is torn
+        down instead, so the next lease provisions it again.
+        """
+        try:
+            ctx.discard_test_objects()
+            if ctx.reset_to_baseline():
+                save_snapshot(ctx.partition_id, ctx.snapshot())
+                ctx.close()
+            else:
+                logger.warning("Partition %s could not be reset to its baseline; tearing it down", ctx.partition_id)
+                save_snapshot(ctx.partition_id, None)
+                ctx.tear_down()
+        finally:
+            self.release(ctx.partition_id)
+
+    def release(self, partition_id: str) -> None:
+        lock = self.leases.pop(partition_id, None)
+        if lock is not None:
+            lock.release()
@@ -0,0 +1,50 @@
+import fcntl
+import os
+import time
+
+from filelock import FileLock, Timeout
+
+
+class ReadWriteFileLock(object):
+    """
+    A lock shared between processes that many readers can hold at once, or a single writer.
+
+    Readers and writers hold `flock` locks on the same file, shared and exclusive respectively.  A writer first takes
+    an intent lock that readers pass through on their way in, so readers arriving while a writer waits queue behind
+    it instead of starving it.
+    """
+
+    def __init__(self, path: str, poll_interval: float = 0.05):
+        self.path = path
+        self.intent = FileLock(path + ".intent")
+        self.poll_interval = poll_interval
+        self.fd = None
+
+    def acquire(self, shared: bool, timeout: float) -> None:
+        """
+        :param shared: true to take the lock as a reader, false to take it as the only writer
+        :param timeout: the number of seconds to wait before raising `filelock.Timeout`
+        """
+        deadline = time.monotonic() + timeout
+        self.intent.acquire(timeout=timeout)
+        try:
+            self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT)
+            operation = (fcntl.LOCK_SH if shared else fcntl.LOCK_EX) | fcntl.LOCK_NB
+            while True:
+                try:
+                    fcntl.flock(self.fd, operation)
+                    return
+                except BlockingIOError:
+                    if time.monotonic() >= deadline:
+                        os.close(self.fd)
+                        self.fd = None
+                        raise Timeout(self.path)
+                    time.sleep(self.poll_interval)
+        finally:
+            self.intent.release()
+
+    def release(self) -> None:
+        if self.fd is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+            os.close(self.fd)
+            self.fd = None
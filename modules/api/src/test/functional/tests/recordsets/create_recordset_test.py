@@ -42,12 +42,9 @@ def test_create_recordset_with_dns_verify(shared_zone_test_context):
         assert_that("10.1.1.1", is_in(records))
         assert_that("10.2.2.2", is_in(records))
 
-        answers = dns_resolve(shared_zone_test_context.ok_zone, result_rs["name"], result_rs["type"])
-        rdata_strings = rdata(answers)
-
-        assert_that(answers, has_length(2))
-        assert_that("10.1.1.1", is_in(rdata_strings))
-        assert_that("10.2.2.2", is_in(rdata_strings))
+        # every name server for the zone should eventually answer with both addresses
+        wait_until_dns_answer(shared_zone_test_context.ok_zone, result_rs["name"], result_rs["type"],
+                              ["10.1.1.1", "10.2.2.2"])
     finally:
         if result_rs:
             try:
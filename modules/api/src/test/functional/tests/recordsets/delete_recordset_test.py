@@ -139,10 +139,8 @@ def test_delete_recordset_with_verify(shared_zone_test_context):
         delete_result = client.delete_recordset(result_rs["zoneId"], result_rs["id"], status=202)
         client.wait_until_recordset_change_status(delete_result, "Complete")
 
-        answers = dns_resolve(shared_zone_test_context.ok_zone, result_rs["name"], result_rs["type"])
-        not_found = len(answers) == 0
-
-        assert_that(not_found, is_(True))
+        # every name server for the zone should eventually stop answering for the record
+        wait_until_dns_answer(shared_zone_test_context.ok_zone, result_rs["name"], result_rs["type"], [])
 
         result_rs = None
     finally:
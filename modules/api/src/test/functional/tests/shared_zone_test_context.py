@@ -1,8 +1,12 @@
 import copy
 import inspect
 import logging
-from typing import MutableMapping, Mapping
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterable, List, MutableMapping, Mapping, Optional
 
+from task_graph import TaskGraph
+from teardown_plan import TeardownError, TeardownPlan
 from tests.list_batch_summaries_test_context import ListBatchChangeSummariesTestContext
 from tests.list_groups_test_context import ListGroupsTestContext
 from tests.list_recordsets_test_context import ListRecordSetsTestContext
@@ -14,16 +18,136 @@ from vinyldns_python import VinylDNSClient
 logger = logging.getLogger(__name__)
 
 
+def dns_connection(name: str) -> Mapping:
+    """
+    Builds the connection to the test name server used for both the connection and transfer connection of a zone
+    """
+    return {
+        "name": name,
+        "keyName": VinylDNSTestContext.dns_key_name,
+        "key": VinylDNSTestContext.dns_key,
+        "algorithm": VinylDNSTestContext.dns_key_algo,
+        "primaryServer": VinylDNSTestContext.name_server_ip
+    }
+
+
+class Provisioned(object):
+    """
+    A zone, group or sub-context of the shared context that is provisioned the first time a test uses it.  Reading
+    the attribute runs its task on the context's task graph (and everything the task depends on) and waits for it.
+    """
+
+    def __init__(self, task: Optional[str] = None):
+        """
+        :param task: the task that provisions the attribute, by default the task named after the attribute
+        """
+        self.task = task
+
+    def __set_name__(self, owner, name):
+        self.name = name
+        self.task = self.task or name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        instance.graph.result(self.task)
+        return instance.resources[self.name]
+
+    def __set__(self, instance, value):
+        instance.resources[self.name] = value
+
+
+class ZoneActivationWaiter(object):
+    """
+    Shares one readiness wait between the zones that are being provisioned at the same time.  Zone tasks register
+    their zone and block; a single poller waits for everything registered so far with `wait_until_zones_active`,
+    and zones registered while a round is running are picked up by the next round.
+    """
+
+    def __init__(self, client: VinylDNSClient):
+        """
+        :param client: a client that can see every zone being waited on
+        """
+        self.client = client
+        self.lock = threading.Lock()
+        self.pending: MutableMapping[str, Future] = {}
+        self.polling = False
+
+    def wait(self, zone_id: str) -> None:
+        """
+        Waits until a zone is active
+        """
+        with self.lock:
+            future = self.pending.setdefault(zone_id, Future())
+            if not self.polling:
+                self.polling = True
+                threading.Thread(target=self.poll, name="zone-activation", daemon=True).start()
+        future.result()
+
+    def poll(self) -> None:
+        while True:
+            with self.lock:
+                batch, self.pending = self.pending, {}
+                if not batch:
+                    self.polling = False
+                    return
+            try:
+                self.client.wait_until_zones_active(list(batch))
+            except BaseException as e:
+                for future in batch.values():
+                    future.set_exception(e)
+            else:
+                for future in batch.values():
+                    future.set_result(None)
+
+
 class SharedZoneTestContext(object):
     """
-    Creates multiple zones to test authorization / access to shared zones across users
+    Creates multiple zones to test authorization / access to shared zones across users.
+
+    Zones, groups and the list contexts are provisioned lazily: each one is created the first time a test reads it,
+    and `prefetch` starts creating the ones the selected tests are known to need in the background.
     """
     _data_cache: MutableMapping[str, MutableMapping[str, Mapping]] = {}
 
+    GROUPS = ["ok_group", "dummy_group", "shared_record_group", "history_group"]
+
+    ZONES = ["history_zone", "ok_zone", "dummy_zone", "ip6_reverse_zone", "ip6_16_nibble_zone", "ip4_reverse_zone",
+             "classless_base_zone", "classless_zone_delegation_zone", "system_test_zone", "parent_zone", "ds_zone",
+             "requires_review_zone", "shared_zone"]
+
+    # The state a later run needs to reuse this context instead of provisioning it again
+    SNAPSHOT_ATTRIBUTES = GROUPS + ZONES + ["group_activity_created", "group_activity_updated", "ip4_10_prefix",
+                                            "ip4_classless_prefix", "ip6_prefix"]
+
+    ok_group = Provisioned()
+    dummy_group = Provisioned()
+    shared_record_group = Provisioned()
+    history_group = Provisioned()
+    group_activity_created = Provisioned("group_activity")
+    group_activity_updated = Provisioned("group_activity")
+
+    # the history zone is only handed out once its change history has been built
+    history_zone = Provisioned()
+    ok_zone = Provisioned()
+    dummy_zone = Provisioned()
+    ip6_reverse_zone = Provisioned()
+    ip6_16_nibble_zone = Provisioned()
+    ip4_reverse_zone = Provisioned()
+    classless_base_zone = Provisioned()
+    classless_zone_delegation_zone = Provisioned()
+    system_test_zone = Provisioned()
+    parent_zone = Provisioned()
+    ds_zone = Provisioned()
+    requires_review_zone = Provisioned()
+    shared_zone = Provisioned()
+
+    list_zones = Provisioned()
+    list_records_context = Provisioned()
+    list_groups_context = Provisioned()
 
     def __init__(self, partition_id: str):
         self.partition_id = partition_id
-        self.setup_started = False
         self.ok_vinyldns_client = VinylDNSClient(VinylDNSTestContext.vinyldns_url, "okAccessKey", "okSecretKey")
         self.dummy_vinyldns_client = VinylDNSClient(VinylDNSTestContext.vinyldns_url, "dummyAccessKey", "dummySecretKey")
         self.shared_zone_vinyldns_client = VinylDNSClient(VinylDNSTestContext.vinyldns_url, "sharedZoneUserAccessKey", "sharedZoneUserSecretKey")
@@ -36,450 +160,306 @@ class SharedZoneTestContext(object):
         self.clients = [self.ok_vinyldns_client, self.dummy_vinyldns_client, self.shared_zone_vinyldns_client,
                         self.support_user_client, self.super_user_client, self.unassociated_client,
                         self.test_user_client, self.history_client, self.non_user_client]
-        self.list_zones = ListZonesTestContext(partition_id)
-        self.list_zones_client = self.list_zones.client
-        self.list_records_context = ListRecordSetsTestContext(partition_id)
-        self.list_groups_context = ListGroupsTestContext(partition_id)
         self.list_batch_summaries_context = ListBatchChangeSummariesTestContext(partition_id)
 
-        self.dummy_group = None
-        self.ok_group = None
-        self.shared_record_group = None
-        self.history_group = None
-        self.group_activity_created = None
-        self.group_activity_updated = None
-
-        self.history_zone = None
-        self.ok_zone = None
-        self.dummy_zone = None
-        self.ip6_reverse_zone = None
-        self.ip6_16_nibble_zone = None
-        self.ip4_reverse_zone = None
-        self.classless_base_zone = None
-        self.classless_zone_delegation_zone = None
-        self.system_test_zone = None
-        self.parent_zone = None
-        self.ds_zone = None
-        self.requires_review_zone = None
-        self.shared_zone = None
-
-        self.ip4_10_prefix = None
-        self.ip4_classless_prefix = None
-        self.ip6_prefix = None
-
-
-    def setup(self):
-        if self.setup_started:
-            # Safeguard against reentrance
-            return
-        self.setup_started = True
+        # the provisioned values of the lazy attributes; the list contexts exist up front and are set up lazily
+        list_zones = ListZonesTestContext(partition_id)
+        self.resources: MutableMapping[str, object] = {
+            "list_zones": list_zones,
+            "list_records_context": ListRecordSetsTestContext(partition_id),
+            "list_groups_context": ListGroupsTestContext(partition_id)
+        }
+        self.list_zones_client = list_zones.client
 
-        partition_id = self.partition_id
-        try:
-            ok_group = {
-                "name": f"ok-group{partition_id}",
-                "email": "test@test.com",
-                "description": "this is a description",
-                "members": [{"id": "ok"}, {"id": "support-user-id"}],
-                "admins": [{"id": "ok"}]
-            }
+        self.ip6_prefix = f"fd69:27cc:fe9{partition_id}"
+        self.ip4_10_prefix = f"10.{partition_id}"
+        self.ip4_classless_prefix = f"192.0.{partition_id}"
 
-            self.ok_group = self.ok_vinyldns_client.create_group(ok_group, status=200)
-            # in theory this shouldn"t be needed, but getting "user is not in group' errors on zone creation
-            self.confirm_member_in_group(self.ok_vinyldns_client, self.ok_group)
+        # fingerprints of every zone and group this context created, captured when it was provisioned; only kept
+        # when the context is saved for another run, see `track_baseline`
+        self.baseline = None
+        self.baseline_lock = threading.Lock()
 
-            dummy_group = {
-                "name": f"dummy-group{partition_id}",
-                "email": "test@test.com",
-                "description": "this is a description",
-                "members": [{"id": "dummy"}],
-                "admins": [{"id": "dummy"}]
-            }
-            self.dummy_group = self.dummy_vinyldns_client.create_group(dummy_group, status=200)
-            # in theory this shouldn"t be needed, but getting "user is not in group' errors on zone creation
-            self.confirm_member_in_group(self.dummy_vinyldns_client, self.dummy_group)
+        # the support user can see every zone of the context
+        self.zone_waiter = ZoneActivationWaiter(self.support_user_client)
+        self.graph = self.setup_graph()
 
-            shared_record_group = {
-                "name": f"record-ownergroup{partition_id}",
-                "email": "test@test.com",
-                "description": "this is a description",
-                "members": [{"id": "sharedZoneUser"}, {"id": "ok"}, {"id": "support-user-id"}],
-                "admins": [{"id": "sharedZoneUser"}, {"id": "ok"}]
-            }
-            self.shared_record_group = self.ok_vinyldns_client.create_group(shared_record_group, status=200)
+    @classmethod
+    def provisioned_attributes(cls) -> List[str]:
+        """
+        The attributes that are provisioned the first time they are read
+        """
+        return [name for name, value in vars(cls).items() if isinstance(value, Provisioned)]
 
-            history_group = {
-                "name": f"history-group{partition_id}",
-                "email": "test@test.com",
-                "description": "this is a description",
-                "members": [{"id": "history-id"}],
-                "admins": [{"id": "history-id"}]
-            }
-            self.history_group = self.history_client.create_group(history_group, status=200)
-            self.confirm_member_in_group(self.history_client, self.history_group)
-
-            history_zone_change = self.history_client.create_zone(
-                {
-                    "name": f"system-test-history{partition_id}.",
-                    "email": "i.changed.this.1.times@history-test.com",
-                    "shared": False,
-                    "adminGroupId": self.history_group["id"],
-                    "isTest": True,
-                    "connection": {
-                        "name": "vinyldns.",
-                        "keyName": VinylDNSTestContext.dns_key_name,
-                        "key": VinylDNSTestContext.dns_key,
-                        "algorithm": VinylDNSTestContext.dns_key_algo,
-                        "primaryServer": VinylDNSTestContext.name_server_ip
-                    },
-                    "transferConnection": {
-                        "name": "vinyldns.",
-                        "keyName": VinylDNSTestContext.dns_key_name,
-                        "key": VinylDNSTestContext.dns_key,
-                        "algorithm": VinylDNSTestContext.dns_key_algo,
-                        "primaryServer": VinylDNSTestContext.name_server_ip
-                    }
-                }, status=202)
-            self.history_zone = history_zone_change["zone"]
-
-            # initialize history
-            self.history_client.wait_until_zone_active(history_zone_change["zone"]["id"])
-            self.init_history()
-
-            ok_zone_change = self.ok_vinyldns_client.create_zone(
-                {
-                    "name": f"ok{partition_id}.",
-                    "email": "test@test.com",
-                    "shared": False,
-                    "adminGroupId": self.ok_group["id"],
-                    "isTest": True,
-                    "connection": {
-                        "name": "ok.",
-                        "keyName": VinylDNSTestContext.dns_key_name,
-                        "key": VinylDNSTestContext.dns_key,
-                        "algorithm": VinylDNSTestContext.dns_key_algo,
-                        "primaryServer": VinylDNSTestContext.name_server_ip
-                    },
-                    "transferConnection": {
-                        "name": "ok.",
-                        "keyName": VinylDNSTestContext.dns_key_name,
-                        "key": VinylDNSTestContext.dns_key,
-                        "algorithm": VinylDNSTestContext.dns_key_algo,
-                        "primaryServer": VinylDNSTestContext.name_server_ip
-                    }
-                }, status=202)
-            self.ok_zone = ok_zone_change["zone"]
-
-            dummy_zone_change = self.dummy_vinyldns_client.create_zone(
-                {
-                    "name": f"dummy{partition_id}.",
-                    "email": "test@test.com",
-                    "shared": False,
-                    "adminGroupId": self.dummy_group["id"],
-                    "isTest": True,
-                    "acl": {
-                        "rules": [
-                            {
-                                "accessLevel": "Delete",
-                                "description": "some_test_rule",
-                                "userId": "history-id"
-                            }
-                        ]
-                    },
-                    "connection": {
-                        "name": "dummy.",
-                        "keyName": VinylDNSTestContext.dns_key_name,
-                        "key": VinylDNSTestContext.dns_key,
-                        "algorithm": VinylDNSTestContext.dns_key_algo,
-                        "primaryServer": VinylDNSTestContext.name_server_ip
-                    },
-                    "transferConnection": {
-                        "name": "dummy.",
-                        "keyName": VinylDNSTestContext.dns_key_name,
-                        "key": VinylDNSTestContext.dns_key,
-                        "algorithm": VinylDNSTestContext.dns_key_algo,
-                        "primaryServer": VinylDNSTestContext.name_server_ip
-                    }
-                }, status=202)
-            self.dummy_zone = dummy_zone_change["zone"]
-
-            self.ip6_prefix = f"fd69:27cc:fe9{partition_id}"
-            ip6_reverse_zone_change = self.ok_vinyldns_client.create_zone(
-                {
-                    "name": f"{partition_id}.9.e.f.c.c.7.2.9.6.d.f.ip6.arpa.",
-                    "email": "test@test.com",
-                    "shared": False,
-                    "adminGroupId": self.ok_group["id"],
-                    "isTest": True,
-                    "connection": {
-                        "name": "ip6.",
-                        "keyName": VinylDNSTestContext.dns_key_name,
-                        "key": VinylDNSTestContext.dns_key,
-                        "algorithm": VinylDNSTestContext.dns_key_algo,
-                        "primaryServer": VinylDNSTestContext.name_server_ip
-                    },
-                    "transferConnection": {
-                        "name": "ip6.",
-                        "keyName": VinylDNSTestContext.dns_key_name,
-                        "key": VinylDNSTestContext.dns_key,
-                        "algorithm": VinylDNSTestContext.dns_key_algo,
-                        "primaryServer": VinylDNSTestContext.name_server_ip
-                    }
-                }, status=202
-            )
-            self.ip6_reverse_zone = ip6_reverse_zone_change["zone"]
-
-            ip6_16_nibble_zone_change = self.ok_vinyldns_client.create_zone(
-                {
-                    "name": f"0.0.0.1.{partition_id}.9.e.f.c.c.7.2.9.6.d.f.ip6.arpa.",
-                    "email": "test@test.com",
-                    "shared": False,
-                    "adminGroupId": self.ok_group["id"],
-                    "isTest": True,
-                    "backendId": "func-test-backend"
-                }, status=202
-            )
-            self.ip6_16_nibble_zone = ip6_16_nibble_zone_change["zone"]
-
-            self.ip4_10_prefix = f"10.{partition_id}"
-            ip4_reverse_zone_change = self.ok_vinyldns_client.create_zone(
-                {
-                    "name": f"{partition_id}.10.in-addr.arpa.",
-                    "email": "test@test.com",
-                    "shared": False,
-                    "adminGroupId": self.ok_group["id"],
-                    "isTest": True,
-                    "connection": {
-                        "name": "ip4.",
-                        "keyName": VinylDNSTestContext.dns_key_name,
-                        "key": VinylDNSTestContext.dns_key,
-                        "algorithm": VinylDNSTestContext.dns_key_algo,
-                        "primaryServer": VinylDNSTestContext.name_server_ip
-                    },
-                    "transferConnection": {
-                        "name": "ip4.",
-                        "keyName": VinylDNSTestContext.dns_key_name,
-                        "key": VinylDNSTestContext.dns_key,
-                        "algorithm": VinylDNSTestContext.dns_key_algo,
-                        "primaryServer": VinylDNSTestContext.name_server_ip
-                    }
-                }, status=202
-            )
-            self.ip4_reverse_zone = ip4_reverse_zone_change["zone"]
-
-            self.ip4_classless_prefix = f"192.0.{partition_id}"
-            classless_base_zone_change = self.ok_vinyldns_client.create_zone(
-                {
-                    "name": f"{partition_id}.0.192.in-addr.arpa.",
-                    "email": "test@test.com",
-                    "shared": False,
-                    "adminGroupId": self.ok_group["id"],
-                    "isTest": True,
-                    "connection": {
-                        "name": "classless-base.",
-                        "keyName": VinylDNSTestContext.dns_key_name,
-                        "key": VinylDNSTestContext.dns_key,
-                        "algorithm": VinylDNSTestContext.dns_key_algo,
-                        "primaryServer": VinylDNSTestContext.name_server_ip
-                    },
-                    "transferConnection": {
-                        "name": "classless-base.",
-                        "keyName": VinylDNSTestContext.dns_key_name,
-                        "key": VinylDNSTestContext.dns_key,
-                        "algorithm": VinylDNSTestContext.dns_key_algo,
-                        "primaryServer": VinylDNSTestContext.name_server_ip
-                    }
-                }, status=202
-            )
-            self.classless_base_zone = classless_base_zone_change["zone"]
-
-            classless_zone_delegation_change = self.ok_vinyldns_client.create_zone(
-                {
-                    "name": f"192/30.{partition_id}.0.192.in-addr.arpa.",
-                    "email": "test@test.com",
-                    "shared": False,
-                    "adminGroupId": self.ok_group["id"],
-                    "isTest": True,
-                    "connection": {
-                        "name": "classless.",
-                        "keyName": VinylDNSTestContext.dns_key_name,
-                        "key": VinylDNSTestContext.dns_key,
-                        "algorithm": VinylDNSTestContext.dns_key_algo,
-                        "primaryServer": VinylDNSTestContext.name_server_ip
-                    },
-                    "transferConnection": {
-                        "name": "classless.",
-                        "keyName": VinylDNSTestContext.dns_key_name,
-                        "key": VinylDNSTestContext.dns_key,
-                        "algorithm": VinylDNSTestContext.dns_key_algo,
-                        "primaryServer": VinylDNSTestContext.name_server_ip
-                    }
-                }, status=202
-            )
-            self.classless_zone_delegation_zone = classless_zone_delegation_change["zone"]
-
-            system_test_zone_change = self.ok_vinyldns_client.create_zone(
-                {
-                    "name": f"system-test{partition_id}.",
-                    "email": "test@test.com",
-                    "shared": False,
-                    "adminGroupId": self.ok_group["id"],
-                    "isTest": True,
-                    "connection": {
-                        "name": "system-test.",
-                        "keyName": VinylDNSTestContext.dns_key_name,
-                        "key": VinylDNSTestContext.dns_key,
-                        "algorithm": VinylDNSTestContext.dns_key_algo,
-                        "primaryServer": VinylDNSTestContext.name_server_ip
-                    },
-                    "transferConnection": {
-                        "name": "system-test.",
-                        "keyName": VinylDNSTestContext.dns_key_name,
-                        "key": VinylDNSTestContext.dns_key,
-                        "algorithm": VinylDNSTestContext.dns_key_algo,
-                        "primaryServer": VinylDNSTestContext.name_server_ip
-                    }
-                }, status=202
-            )
-            self.system_test_zone = system_test_zone_change["zone"]
-
-            # parent zone gives access to the dummy user, dummy user cannot manage ns records
-            parent_zone_change = self.ok_vinyldns_client.create_zone(
-                {
-                    "name": f"parent.com{partition_id}.",
-                    "email": "test@test.com",
-                    "shared": False,
-                    "adminGroupId": self.ok_group["id"],
-                    "isTest": True,
-                    "acl": {
-                        "rules": [
-                            {
-                                "accessLevel": "Delete",
-                                "description": "some_test_rule",
-                                "userId": "dummy"
-                            }
-                        ]
-                    },
-                    "connection": {
-                        "name": "parent.",
-                        "keyName": VinylDNSTestContext.dns_key_name,
-                        "key": VinylDNSTestContext.dns_key,
-                        "algorithm": VinylDNSTestContext.dns_key_algo,
-                        "primaryServer": VinylDNSTestContext.name_server_ip
-                    },
-                    "transferConnection": {
-                        "name": "parent.",
-                        "keyName": VinylDNSTestContext.dns_key_name,
-                        "key": VinylDNSTestContext.dns_key,
-                        "algorithm": VinylDNSTestContext.dns_key_algo,
-                        "primaryServer": VinylDNSTestContext.name_server_ip
-                    }
-                }, status=202)
-            self.parent_zone = parent_zone_change["zone"]
-
-            # mimicking the spec example
-            ds_zone_change = self.ok_vinyldns_client.create_zone(
-                {
-                    "name": f"example.com{partition_id}.",
-                    "email": "test@test.com",
-                    "shared": False,
-                    "adminGroupId": self.ok_group["id"],
-                    "isTest": True,
-                    "connection": {
-                        "name": "example.",
-                        "keyName": VinylDNSTestContext.dns_key_name,
-                        "key": VinylDNSTestContext.dns_key,
-                        "algorithm": VinylDNSTestContext.dns_key_algo,
-                        "primaryServer": VinylDNSTestContext.name_server_ip
-                    },
-                    "transferConnection": {
-                        "name": "example.",
-                        "keyName": VinylDNSTestContext.dns_key_name,
-                        "key": VinylDNSTestContext.dns_key,
-                        "algorithm": VinylDNSTestContext.dns_key_algo,
-                        "primaryServer": VinylDNSTestContext.name_server_ip
-                    }
-                }, status=202)
-            self.ds_zone = ds_zone_change["zone"]
-
-            # zone with name configured for manual review
-            requires_review_zone_change = self.ok_vinyldns_client.create_zone(
-                {
-                    "name": f"zone.requires.review{partition_id}.",
-                    "email": "test@test.com",
-                    "shared": False,
-                    "adminGroupId": self.ok_group["id"],
-                    "isTest": True,
-                    "backendId": "func-test-backend"
-                }, status=202)
-            self.requires_review_zone = requires_review_zone_change["zone"]
-
-            # Shared zone
-            shared_zone_change = self.support_user_client.create_zone(
-                {
-                    "name": f"shared{partition_id}.",
-                    "email": "test@test.com",
-                    "shared": True,
-                    "adminGroupId": self.shared_record_group["id"],
-                    "isTest": True,
-                    "connection": {
-                        "name": "shared.",
-                        "keyName": VinylDNSTestContext.dns_key_name,
-                        "key": VinylDNSTestContext.dns_key,
-                        "algorithm": VinylDNSTestContext.dns_key_algo,
-                        "primaryServer": VinylDNSTestContext.name_server_ip
-                    },
-                    "transferConnection": {
-                        "name": "shared.",
-                        "keyName": VinylDNSTestContext.dns_key_name,
-                        "key": VinylDNSTestContext.dns_key,
-                        "algorithm": VinylDNSTestContext.dns_key_algo,
-                        "primaryServer": VinylDNSTestContext.name_server_ip
-                    }
-                }, status=202)
-            self.shared_zone = shared_zone_change["zone"]
-
-            # wait until our zones are created
-            self.ok_vinyldns_client.wait_until_zone_active(system_test_zone_change["zone"]["id"])
-            self.ok_vinyldns_client.wait_until_zone_active(ok_zone_change["zone"]["id"])
-            self.dummy_vinyldns_client.wait_until_zone_active(dummy_zone_change["zone"]["id"])
-            self.ok_vinyldns_client.wait_until_zone_active(ip6_reverse_zone_change["zone"]["id"])
-            self.ok_vinyldns_client.wait_until_zone_active(ip6_16_nibble_zone_change["zone"]["id"])
-            self.ok_vinyldns_client.wait_until_zone_active(ip4_reverse_zone_change["zone"]["id"])
-            self.ok_vinyldns_client.wait_until_zone_active(classless_base_zone_change["zone"]["id"])
-            self.ok_vinyldns_client.wait_until_zone_active(classless_zone_delegation_change["zone"]["id"])
-            self.ok_vinyldns_client.wait_until_zone_active(system_test_zone_change["zone"]["id"])
-            self.ok_vinyldns_client.wait_until_zone_active(parent_zone_change["zone"]["id"])
-            self.ok_vinyldns_client.wait_until_zone_active(ds_zone_change["zone"]["id"])
-            self.ok_vinyldns_client.wait_until_zone_active(requires_review_zone_change["zone"]["id"])
-            self.shared_zone_vinyldns_client.wait_until_zone_active(shared_zone_change["zone"]["id"])
-
-            # initialize group activity
-            self.init_group_activity()
-
-            # initialize list zones, only do this when constructing the whole!
-            self.list_zones.setup()
-
-            # note: there are no state to load, the tests only need the client
-            self.list_zones_client = self.list_zones.client
-
-            # build the list of records; note: we do need to save the test records
-            self.list_records_context.setup()
-
-            # build the list of groups
-            self.list_groups_context.setup()
+    def setup(self):
+        """
+        Provisions everything in the context and waits for it
+        """
+        try:
+            self.graph.run()
         except Exception:
             # Cleanup if setup fails
             self.tear_down()
             traceback.print_exc()
             raise
 
-    def init_history(self):
+    def prefetch(self, attributes: Iterable[str]) -> None:
+        """
+        Starts provisioning the given attributes in the background; tests reading them wait for whatever is left
+        """
+        tasks = set(vars(type(self))[name].task for name in attributes if name in self.provisioned_attributes())
+        for task in sorted(tasks):
+            self.graph.submit(task)
+
+    def peek(self, attribute: str):
+        """
+        Gets a lazy attribute without provisioning it
+        :return: the value, or None if it has not been provisioned
+        """
+        if not self.is_provisioned(attribute):
+            return None
+        return self.resources.get(attribute)
+
+    def is_provisioned(self, attribute: str) -> bool:
+        descriptor = vars(type(self)).get(attribute)
+        return not isinstance(descriptor, Provisioned) or self.graph.succeeded(descriptor.task)
+
+    def track_baseline(self) -> None:
+        """
+        Fingerprints each zone and group as soon as it is provisioned, so the context can be saved for another run
+        """
+        self.baseline = {"zones": {}, "groups": {}}
+
+    def add_to_baseline(self, zone_ids: Iterable[str] = (), group_ids: Iterable[str] = ()) -> None:
+        if self.baseline is None:
+            return
+
+        zones = dict((zone_id, zone_fingerprint(self.support_user_client, zone_id)) for zone_id in zone_ids)
+        groups = dict((group_id, group_fingerprint(self.support_user_client, group_id)) for group_id in group_ids)
+        with self.baseline_lock:
+            self.baseline["zones"].update(zones)
+            self.baseline["groups"].update(groups)
+
+    def setup_graph(self) -> TaskGraph:
+        """
+        Builds the graph of everything the shared context provisions, with one task per lazy attribute.  Groups,
+        zones and the list contexts are independent of each other except where a zone needs its admin group, so
+        whatever is requested together is created concurrently.
+        """
+        partition_id = self.partition_id
+        graph = TaskGraph()
+
+        graph.add("ok_group", lambda: self.create_group("ok_group", self.ok_vinyldns_client, {
+            "name": f"ok-group{partition_id}",
+            "email": "test@test.com",
+            "description": "this is a description",
+            "members": [{"id": "ok"}, {"id": "support-user-id"}],
+            "admins": [{"id": "ok"}]
+        }, confirm_membership=True))
+        graph.add("dummy_group", lambda: self.create_group("dummy_group", self.dummy_vinyldns_client, {
+            "name": f"dummy-group{partition_id}",
+            "email": "test@test.com",
+            "description": "this is a description",
+            "members": [{"id": "dummy"}],
+            "admins": [{"id": "dummy"}]
+        }, confirm_membership=True))
+        graph.add("shared_record_group", lambda: self.create_group("shared_record_group", self.ok_vinyldns_client, {
+            "name": f"record-ownergroup{partition_id}",
+            "email": "test@test.com",
+            "description": "this is a description",
+            "members": [{"id": "sharedZoneUser"}, {"id": "ok"}, {"id": "support-user-id"}],
+            "admins": [{"id": "sharedZoneUser"}, {"id": "ok"}]
+        }))
+        graph.add("history_group", lambda: self.create_group("history_group", self.history_client, {
+            "name": f"history-group{partition_id}",
+            "email": "test@test.com",
+            "description": "this is a description",
+            "members": [{"id": "history-id"}],
+            "admins": [{"id": "history-id"}]
+        }, confirm_membership=True))
+
+        graph.add("history_zone", lambda: self.create_history_zone({
+            "name": f"system-test-history{partition_id}.",
+            "email": "i.changed.this.1.times@history-test.com",
+            "shared": False,
+            "adminGroupId": self.history_group["id"],
+            "isTest": True,
+            "connection": dns_connection("vinyldns."),
+            "transferConnection": dns_connection("vinyldns.")
+        }), depends_on=["history_group"])
+        graph.add("ok_zone", lambda: self.create_zone("ok_zone", self.ok_vinyldns_client, {
+            "name": f"ok{partition_id}.",
+            "email": "test@test.com",
+            "shared": False,
+            "adminGroupId": self.ok_group["id"],
+            "isTest": True,
+            "connection": dns_connection("ok."),
+            "transferConnection": dns_connection("ok.")
+        }), depends_on=["ok_group"])
+        graph.add("dummy_zone", lambda: self.create_zone("dummy_zone", self.dummy_vinyldns_client, {
+            "name": f"dummy{partition_id}.",
+            "email": "test@test.com",
+            "shared": False,
+            "adminGroupId": self.dummy_group["id"],
+            "isTest": True,
+            "acl": {
+                "rules": [
+                    {
+                        "accessLevel": "Delete",
+                        "description": "some_test_rule",
+                        "userId": "history-id"
+                    }
+                ]
+            },
+            "connection": dns_connection("dummy."),
+            "transferConnection": dns_connection("dummy.")
+        }), depends_on=["dummy_group"])
+        graph.add("ip6_reverse_zone", lambda: self.create_zone("ip6_reverse_zone", self.ok_vinyldns_client, {
+            "name": f"{partition_id}.9.e.f.c.c.7.2.9.6.d.f.ip6.arpa.",
+            "email": "test@test.com",
+            "shared": False,
+            "adminGroupId": self.ok_group["id"],
+            "isTest": True,
+            "connection": dns_connection("ip6."),
+            "transferConnection": dns_connection("ip6.")
+        }), depends_on=["ok_group"])
+        graph.add("ip6_16_nibble_zone", lambda: self.create_zone("ip6_16_nibble_zone", self.ok_vinyldns_client, {
+            "name": f"0.0.0.1.{partition_id}.9.e.f.c.c.7.2.9.6.d.f.ip6.arpa.",
+            "email": "test@test.com",
+            "shared": False,
+            "adminGroupId": self.ok_group["id"],
+            "isTest": True,
+            "backendId": "func-test-backend"
+        }), depends_on=["ok_group"])
+        graph.add("ip4_reverse_zone", lambda: self.create_zone("ip4_reverse_zone", self.ok_vinyldns_client, {
+            "name": f"{partition_id}.10.in-addr.arpa.",
+            "email": "test@test.com",
+            "shared": False,
+            "adminGroupId": self.ok_group["id"],
+            "isTest": True,
+            "connection": dns_connection("ip4."),
+            "transferConnection": dns_connection("ip4.")
+        }), depends_on=["ok_group"])
+        graph.add("classless_base_zone", lambda: self.create_zone("classless_base_zone", self.ok_vinyldns_client, {
+            "name": f"{partition_id}.0.192.in-addr.arpa.",
+            "email": "test@test.com",
+            "shared": False,
+            "adminGroupId": self.ok_group["id"],
+            "isTest": True,
+            "connection": dns_connection("classless-base."),
+            "transferConnection": dns_connection("classless-base.")
+        }), depends_on=["ok_group"])
+        graph.add("classless_zone_delegation_zone", lambda: self.create_zone("classless_zone_delegation_zone",
+                                                                             self.ok_vinyldns_client, {
+            "name": f"192/30.{partition_id}.0.192.in-addr.arpa.",
+            "email": "test@test.com",
+            "shared": False,
+            "adminGroupId": self.ok_group["id"],
+            "isTest": True,
+            "connection": dns_connection("classless."),
+            "transferConnection": dns_connection("classless.")
+        }), depends_on=["ok_group"])
+        graph.add("system_test_zone", lambda: self.create_zone("system_test_zone", self.ok_vinyldns_client, {
+            "name": f"system-test{partition_id}.",
+            "email": "test@test.com",
+            "shared": False,
+            "adminGroupId": self.ok_group["id"],
+            "isTest": True,
+            "connection": dns_connection("system-test."),
+            "transferConnection": dns_connection("system-test.")
+        }), depends_on=["ok_group"])
+        # parent zone gives access to the dummy user, dummy user cannot manage ns records
+        graph.add("parent_zone", lambda: self.create_zone("parent_zone", self.ok_vinyldns_client, {
+            "name": f"parent.com{partition_id}.",
+            "email": "test@test.com",
+            "shared": False,
+            "adminGroupId": self.ok_group["id"],
+            "isTest": True,
+            "acl": {
+                "rules": [
+                    {
+                        "accessLevel": "Delete",
+                        "description": "some_test_rule",
+                        "userId": "dummy"
+                    }
+                ]
+            },
+            "connection": dns_connection("parent."),
+            "transferConnection": dns_connection("parent.")
+        }), depends_on=["ok_group"])
+        # mimicking the spec example
+        graph.add("ds_zone", lambda: self.create_zone("ds_zone", self.ok_vinyldns_client, {
+            "name": f"example.com{partition_id}.",
+            "email": "test@test.com",
+            "shared": False,
+            "adminGroupId": self.ok_group["id"],
+            "isTest": True,
+            "connection": dns_connection("example."),
+            "transferConnection": dns_connection("example.")
+        }), depends_on=["ok_group"])
+        # zone with name configured for manual review
+        graph.add("requires_review_zone", lambda: self.create_zone("requires_review_zone", self.ok_vinyldns_client, {
+            "name": f"zone.requires.review{partition_id}.",
+            "email": "test@test.com",
+            "shared": False,
+            "adminGroupId": self.ok_group["id"],
+            "isTest": True,
+            "backendId": "func-test-backend"
+        }), depends_on=["ok_group"])
+        # Shared zone
+        graph.add("shared_zone", lambda: self.create_zone("shared_zone", self.support_user_client, {
+            "name": f"shared{partition_id}.",
+            "email": "test@test.com",
+            "shared": True,
+            "adminGroupId": self.shared_record_group["id"],
+            "isTest": True,
+            "connection": dns_connection("shared."),
+            "transferConnection": dns_connection("shared.")
+        }), depends_on=["shared_record_group"])
+
+        graph.add("group_activity", self.init_group_activity)
+
+        # initialize list zones
+        graph.add("list_zones", lambda: self.setup_sub_context("list_zones"))
+        # build the list of records; note: we do need to save the test records
+        graph.add("list_records_context", lambda: self.setup_sub_context("list_records_context"))
+        # build the list of groups
+        graph.add("list_groups_context", lambda: self.setup_sub_context("list_groups_context"))
+
+        return graph
+
+    def create_group(self, attribute: str, client: VinylDNSClient, group: Mapping, confirm_membership: bool = False):
+        created_group = client.create_group(group, status=200)
+        if confirm_membership:
+            # in theory this shouldn't be needed, but getting "user is not in group' errors on zone creation
+            self.confirm_member_in_group(client, created_group)
+        self.resources[attribute] = created_group
+        self.add_to_baseline(group_ids=[created_group["id"]])
+
+    def create_zone(self, attribute: str, client: VinylDNSClient, zone: Mapping):
+        zone_change = client.create_zone(zone, status=202)
+        self.zone_waiter.wait(zone_change["zone"]["id"])
+        self.resources[attribute] = zone_change["zone"]
+        self.add_to_baseline(zone_ids=[zone_change["zone"]["id"]])
+
+    def create_history_zone(self, zone: Mapping):
+        self.create_zone("history_zone", self.history_client, zone)
+        self.init_history(self.resources["history_zone"])
+        self.add_to_baseline(zone_ids=[self.resources["history_zone"]["id"]])
+
+    def setup_sub_context(self, attribute: str):
+        context = self.resources[attribute]
+        context.setup()
+        clients = [client for client in vars(context).values() if isinstance(client, VinylDNSClient)]
+        self.add_to_baseline([zone_id for client in clients for zone_id in client.created_zones],
+                             [group_id for client in clients for group_id in client.created_groups])
+
+    def init_history(self, history_zone: Mapping):
         # Initialize the zone history
         # change the zone nine times to we have update events in zone change history,
         # ten total changes including creation
         for i in range(2, 11):
-            zone_update = copy.deepcopy(self.history_zone)
+            zone_update = copy.deepcopy(history_zone)
             zone_update["connection"]["key"] = VinylDNSTestContext.dns_key
             zone_update["transferConnection"]["key"] = VinylDNSTestContext.dns_key
             zone_update["email"] = "i.changed.this.{0}.times@history-test.com".format(i)
@@ -487,11 +467,11 @@ class SharedZoneTestContext(object):
 
         # create some record sets
         test_a = TestData.A.copy()
-        test_a["zoneId"] = self.history_zone["id"]
+        test_a["zoneId"] = history_zone["id"]
         test_aaaa = TestData.AAAA.copy()
-        test_aaaa["zoneId"] = self.history_zone["id"]
+        test_aaaa["zoneId"] = history_zone["id"]
         test_cname = TestData.CNAME.copy()
-        test_cname["zoneId"] = self.history_zone["id"]
+        test_cname["zoneId"] = history_zone["id"]
 
         a_record = self.history_client.create_recordset(test_a, status=202)["recordSet"]
         aaaa_record = self.history_client.create_recordset(test_aaaa, status=202)["recordSet"]
@@ -559,39 +539,190 @@ class SharedZoneTestContext(object):
             })
             updated_groups.append(client.update_group(update_groups[runner]["id"], update_groups[runner], status=200))
 
-        self.group_activity_created = created_group
-        self.group_activity_updated = updated_groups
+        self.resources["group_activity_created"] = created_group
+        self.resources["group_activity_updated"] = updated_groups
+        self.add_to_baseline(group_ids=[created_group["id"]])
 
     def tear_down(self):
         """
+        Deletes everything this context and its sub-contexts created: recordsets first, then zones, then groups, with
+        the deletions in each step done concurrently.  Every deletion is attempted even if some fail.
+
         The ok_vinyldns_client is a zone admin on _all_ the zones.
 
         We shouldn't have to do any checks now, as zone admins have full rights to all zones, including
         deleting all records (even in the old shared model)
         """
-        try:
-            self.list_zones.tear_down()
-            self.list_records_context.tear_down()
+        # let anything still being provisioned finish, so it is cleaned up too
+        self.graph.close()
 
-            if self.list_batch_summaries_context:
-                self.list_batch_summaries_context.tear_down(self)
+        plan = TeardownPlan()
+        for client in self.tracked_clients().values():
+            plan.add_client(client)
+        self.list_batch_summaries_context.plan_tear_down(plan, self)
 
-            if self.list_groups_context:
-                self.list_groups_context.tear_down()
+        failures = plan.run()
+        if failures:
+            raise TeardownError(failures)
 
-            for client in self.clients:
-                client.clear_zones()
+    def close(self):
+        """
+        Closes every client without deleting anything, leaving the context in place for another run
+        """
+        self.graph.close()
+        for client in self.tracked_clients().values():
+            client.tear_down()
 
-            for client in self.clients:
-                client.clear_groups()
+    def tracked_clients(self) -> Mapping[str, VinylDNSClient]:
+        """
+        The clients that create the long-lived objects of this context, by a stable name
+        """
+        return {
+            "ok": self.ok_vinyldns_client,
+            "dummy": self.dummy_vinyldns_client,
+            "shared_zone": self.shared_zone_vinyldns_client,
+            "support_user": self.support_user_client,
+            "super_user": self.super_user_client,
+            "unassociated": self.unassociated_client,
+            "test_user": self.test_user_client,
+            "history": self.history_client,
+            "non_user": self.non_user_client,
+            "list_zones": self.resources["list_zones"].client,
+            "list_records": self.resources["list_records_context"].client,
+            "list_groups": self.resources["list_groups_context"].client,
+            "list_groups_support_user": self.resources["list_groups_context"].support_user_client
+        }
 
-            # Close all clients
-            for client in self.clients:
-                client.tear_down()
+    def snapshot_contexts(self) -> Mapping[str, object]:
+        return {
+            "shared": self,
+            "list_zones": self.resources["list_zones"],
+            "list_records": self.resources["list_records_context"]
+        }
 
-        except Exception:
-            traceback.print_exc()
-            raise
+    def capture_baseline(self, only: Optional[Mapping[str, Mapping]] = None) -> Mapping[str, Mapping[str, Mapping]]:
+        """
+        Fingerprints every zone and group created by this context, as seen by the support user
+        :param only: a baseline; when given, only the zones and groups in it are fingerprinted, so objects the tests
+        created through the shared clients are not compared
+        """
+        if only is not None:
+            zone_ids = list(only["zones"])
+            group_ids = list(only["groups"])
+        else:
+            zone_ids = [zone_id for client in self.tracked_clients().values() for zone_id in client.created_zones]
+            group_ids = [group_id for client in self.tracked_clients().values() for group_id in client.created_groups]
+
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            zones = executor.map(lambda zone_id: zone_fingerprint(self.support_user_client, zone_id), zone_ids)
+            groups = executor.map(lambda group_id: group_fingerprint(self.support_user_client, group_id), group_ids)
+            return {
+                "zones": dict(zip(zone_ids, zones)),
+                "groups": dict(zip(group_ids, groups))
+            }
+
+    def snapshot(self) -> Mapping:
+        """
+        Captures everything needed to restore this context in a later run, see `restore`.  Only what has been
+        provisioned is captured; the rest stays lazy in the restored context.
+        """
+        self.graph.wait()
+        baseline = self.baseline or self.capture_baseline()
+        return {
+            "url": VinylDNSTestContext.vinyldns_url,
+            "provisioned": [task for task in self.graph.tasks if self.graph.succeeded(task)],
+            "attributes": dict((name, dict((attribute, getattr(context, attribute))
+                                           for attribute in context.SNAPSHOT_ATTRIBUTES
+                                           if context is not self or self.is_provisioned(attribute)))
+                               for name, context in self.snapshot_contexts().items()),
+            "created": dict((name, {"zones": [z for z in client.created_zones if z in baseline["zones"]],
+                                    "groups": [g for g in client.created_groups if g in baseline["groups"]]})
+                            for name, client in self.tracked_clients().items()),
+            "baseline": baseline
+        }
+
+    def restore(self, snapshot: Mapping) -> bool:
+        """
+        Restores the context from a snapshot taken by an earlier run.  The snapshot is only used if every zone and
+        group it references still exists and is unchanged from when it was provisioned.
+
+        :param snapshot: the snapshot, or None
+        :return: True if the context was restored; False if it must be provisioned (and cleaned up) instead
+        """
+        if not snapshot or snapshot.get("url") != VinylDNSTestContext.vinyldns_url:
+            return False
+
+        for name, attributes in snapshot["attributes"].items():
+            context = self.snapshot_contexts()[name]
+            for attribute, value in attributes.items():
+                setattr(context, attribute, value)
+        for name, created in snapshot["created"].items():
+            client = self.tracked_clients()[name]
+            client.created_zones = list(created["zones"])
+            client.created_groups = list(created["groups"])
+
+        current = self.capture_baseline(only=snapshot["baseline"])
+        if current != snapshot["baseline"]:
+            changed = [object_id for kind in ["zones", "groups"] for object_id, fingerprint in current[kind].items()
+                       if snapshot["baseline"][kind].get(object_id) != fingerprint]
+            logger.info("Snapshot for partition %s is stale; changed or missing: %s", self.partition_id, changed)
+            return False
+
+        self.baseline = current
+        # snapshots taken before provisioning was lazy always had everything provisioned
+        for task in snapshot.get("provisioned", list(self.graph.tasks)):
+            self.graph.set_result(task)
+            if isinstance(self.resources.get(task), (ListZonesTestContext, ListRecordSetsTestContext,
+                                                     ListGroupsTestContext)):
+                self.resources[task].setup_started = True
+        return True
+
+    def discard_test_objects(self) -> None:
+        """
+        Deletes the zones and groups that tests created through the shared clients and left behind, i.e. everything
+        the clients created that is not part of the baseline, and forgets about them
+        """
+        # anything still being provisioned is not in the baseline yet
+        self.graph.wait()
+
+        plan = TeardownPlan()
+        for client in self.tracked_clients().values():
+            for zone_id in client.created_zones:
+                if zone_id not in self.baseline["zones"]:
+                    plan.delete_zone(client, zone_id)
+            for group_id in client.created_groups:
+                if group_id not in self.baseline["groups"]:
+                    plan.delete_group(client, group_id)
+
+        for name, error in plan.run():
+            logger.warning("Could not delete %s left by a test in partition %s: %r", name, self.partition_id, error)
+        for client in self.tracked_clients().values():
+            client.created_zones = [z for z in client.created_zones if z in self.baseline["zones"]]
+            client.created_groups = [g for g in client.created_groups if g in self.baseline["groups"]]
+
+    def reset_to_baseline(self) -> bool:
+        """
+        Reverts ACL rules that tests left on this context's zones, so that the context can be handed to another
+        session as if it was freshly provisioned
+        :return: True if every zone and group matches the baseline afterwards
+        """
+        self.graph.wait()
+        current = self.capture_baseline(only=self.baseline)
+        for zone_id, fingerprint in current["zones"].items():
+            expected = self.baseline["zones"].get(zone_id)
+            if fingerprint is None or expected is None or fingerprint == expected:
+                continue
+            if dict(fingerprint, acl=None) != dict(expected, acl=None):
+                # only acl changes can be reverted
+                continue
+
+            client = next(c for c in self.tracked_clients().values() if zone_id in c.created_zones)
+            zone = client.get_zone(zone_id)["zone"]
+            zone["acl"]["rules"] = [json.loads(rule) for rule in expected["acl"]]
+            update_change = client.update_zone(zone, status=202)
+            client.wait_until_zone_change_status_synced(update_change)
+
+        return self.capture_baseline(only=self.baseline) == self.baseline
 
     @staticmethod
     def confirm_member_in_group(client, group):
@@ -1,6 +1,9 @@
 import json
+import threading
+import time
 import traceback
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 
 import dns.query
 import dns.tsigkeyring
@@ -10,6 +13,71 @@ from hamcrest import *
 
 from vinyldns_context import VinylDNSTestContext
 
+# Bounds for the adaptive backoff used when polling name servers for an answer
+DNS_WAIT_TIMEOUT = 30
+DNS_WAIT_MIN_DELAY = 0.05
+DNS_WAIT_MAX_DELAY = 1.0
+
+
+class DnsAnswerCache(object):
+    """
+    Caches parsed dns answers keyed by name server, fqdn and record type.  Positive answers are kept for the TTL of
+    the answer; NXDOMAIN / NoAnswer results are kept for the negative caching TTL from the SOA in the authority
+    section, and are not cached at all when the server does not include one.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(name_server, fqdn, record_type):
+        fqdn = fqdn.lower()
+        if not fqdn.endswith("."):
+            fqdn += "."
+        return name_server, fqdn, record_type.upper()
+
+    def get(self, name_server, fqdn, record_type):
+        """
+        :return: a copy of the cached records, or None if there is no live entry
+        """
+        key = self.key(name_server, fqdn, record_type)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] <= self.clock():
+                del self.entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return [dict(x) for x in entry[1]]
+
+    def put(self, name_server, fqdn, record_type, records, ttl):
+        if ttl <= 0:
+            return
+        with self.lock:
+            self.entries[self.key(name_server, fqdn, record_type)] = (self.clock() + ttl, [dict(x) for x in records])
+
+    def invalidate(self, fqdn):
+        """
+        Removes every entry for the fqdn, regardless of the name server or record type
+        """
+        _, fqdn, _ = self.key(None, fqdn, "")
+        with self.lock:
+            for key in [k for k in self.entries if k[1] == fqdn]:
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+dns_answer_cache = DnsAnswerCache()
+
 
 def verify_recordset(actual, expected):
     """
@@ -77,10 +145,19 @@ def dns_server_port(zone):
     :return: a tuple (host, port), port is an int
     """
     name_server = zone["connection"]["primaryServer"]
-    name_server_port = 53
     if VinylDNSTestContext.resolver_ip is not None:
         name_server = VinylDNSTestContext.resolver_ip
 
+    return split_name_server(name_server)
+
+
+def split_name_server(name_server):
+    """
+    Parses a name server in `host[:port]` format
+    :param name_server: the name server, optionally including the port
+    :return: a tuple (host, port), port is an int
+    """
+    name_server_port = 53
     if ":" in name_server:
         parts = name_server.split(":")
         name_server = parts[0]
@@ -89,6 +166,24 @@ def dns_server_port(zone):
     return name_server, name_server_port
 
 
+def zone_name_servers(zone):
+    """
+    Gets the distinct name servers that should answer for the zone: the primary server from the zone connection
+    (or the default name server if the zone has none) and the configured resolver
+    :param zone: a populated zone model
+    :return: a list of name servers in `host[:port]` format
+    """
+    connection = zone.get("connection")
+    primary_server = connection["primaryServer"] if connection else VinylDNSTestContext.name_server_ip
+
+    name_servers = []
+    for name_server in [primary_server, VinylDNSTestContext.resolver_ip]:
+        if name_server and name_server not in name_servers:
+            name_servers.append(name_server)
+
+    return name_servers
+
+
 def dns_do_command(zone, record_name, record_type, command, ttl=0, rdata=""):
     """
     Helper for dns add, update, delete
@@ -102,6 +197,7 @@ def dns_do_command(zone, record_name, record_type, command, ttl=0, rdata=""):
     (name_server, name_server_port) = dns_server_port(zone)
     fqdn = record_name + "." + zone["name"]
     update = dns.update.Update(zone["name"], keyring=keyring)
+    dns_answer_cache.invalidate(fqdn)
 
     if command == "add":
         update.add(fqdn, ttl, record_type, rdata)
@@ -151,17 +247,25 @@ def dns_add(zone, record_name, ttl, record_type, rdata):
     return dns_do_command(zone, record_name, record_type, "add", ttl, rdata)
 
 
-def dns_resolve(zone, record_name, record_type):
+def dns_resolve(zone, record_name, record_type, name_server=None, use_cache=None):
     """
     Performs a dns query to find the record name and type against the zone
     :param zone:  a populated zone model
     :param record_name:  the name of the record to lookup
     :param record_type:  the type of record to lookup
+    :param name_server: the name server to query in `host[:port]` format; defaults to the server for the zone
+    :param use_cache: whether to answer from (and populate) the dns answer cache; defaults to `--dns-cache`
     :return: An array of dictionaries, each dict containing fields rdata, type, name, ttl, dclass
     """
+    if use_cache is None:
+        use_cache = VinylDNSTestContext.enable_dns_cache
+
     vinyldns_resolver = dns.resolver.Resolver(configure=False)
 
-    name_server, name_server_port = dns_server_port(zone)
+    if name_server is None:
+        name_server, name_server_port = dns_server_port(zone)
+    else:
+        name_server, name_server_port = split_name_server(name_server)
 
     vinyldns_resolver.nameservers = [name_server]
     vinyldns_resolver.port = name_server_port
@@ -172,14 +276,23 @@ def dns_resolve(zone, record_name, record_type):
         # assert that we are looking up the zone name / @ symbol
         fqdn = vinyldns_resolver.domain
 
+    cache_server = "{0}:{1}".format(name_server, name_server_port)
+    if use_cache:
+        cached = dns_answer_cache.get(cache_server, fqdn, record_type)
+        if cached is not None:
+            return cached
+
+    negative_ttl = 0
     try:
         answers = vinyldns_resolver.resolve(fqdn, record_type)
-    except NXDOMAIN:
+    except NXDOMAIN as e:
         print("query returned NXDOMAIN")
         answers = []
-    except dns.resolver.NoAnswer:
+        negative_ttl = negative_caching_ttl(next(iter(e.kwargs.get("responses", {}).values()), None))
+    except dns.resolver.NoAnswer as e:
         print("query returned NoAnswer")
         answers = []
+        negative_ttl = negative_caching_ttl(e.kwargs.get("response"))
 
     if answers:
         # dns python is goofy, looks like we have to parse text
@@ -188,9 +301,86 @@ def dns_resolve(zone, record_name, record_type):
 
         # for each record, we have exactly 4 fields in order: 1 record name; 2 TTL; 3 DCLASS; 4 TYPE; 5 RDATA
         # construct a simple dictionary based on that split
-        return [parse_record(x) for x in records]
+        result = [parse_record(x) for x in records]
+        ttl = answers.rrset.ttl
     else:
-        return []
+        result = []
+        ttl = negative_ttl
+
+    if use_cache:
+        dns_answer_cache.put(cache_server, fqdn, record_type, result, ttl)
+
+    return result
+
+
+def negative_caching_ttl(response):
+    """
+    Gets the negative caching TTL of a response per RFC 2308: the lesser of the TTL and the minimum field of the
+    SOA in the authority section
+    :param response: a dns message, or None
+    :return: the TTL in seconds, 0 if the response has no SOA
+    """
+    if response is not None:
+        for rrset in response.authority:
+            if rrset.rdtype == dns.rdatatype.SOA:
+                return min(rrset.ttl, rrset[0].minimum)
+    return 0
+
+
+def wait_until_dns_answer(zone, record_name, record_type, expected_rdata, timeout=DNS_WAIT_TIMEOUT,
+                          name_servers=None):
+    """
+    Waits until every name server for the zone answers with exactly the expected rdata.  The servers are
+    queried concurrently; each one is polled with a backoff that doubles while its answer is unchanged and
+    resets as soon as its answer changes.
+
+    :param zone: a populated zone model
+    :param record_name: the name of the record to lookup
+    :param record_type: the type of record to lookup
+    :param expected_rdata: the rdata strings expected in the answer; empty to wait until the record is gone
+    :param timeout: the number of seconds to wait for all servers before failing
+    :param name_servers: the name servers to query; defaults to the primary server and the resolver for the zone
+    :return: a dict of name server to the number of seconds it took for the expected answer to be visible there
+    """
+    expected = set(expected_rdata)
+    name_servers = name_servers or zone_name_servers(zone)
+    started = time.monotonic()
+    deadline = started + timeout
+    last_answers = {}
+
+    def poll(name_server):
+        delay = DNS_WAIT_MIN_DELAY
+        previous = None
+        while True:
+            try:
+                answer = set(rdata(dns_resolve(zone, record_name, record_type, name_server=name_server,
+                                               use_cache=False)))
+            except dns.exception.DNSException as e:
+                answer = {str(e)}
+            last_answers[name_server] = answer
+
+            now = time.monotonic()
+            if answer == expected:
+                return now - started
+            if now >= deadline:
+                return None
+
+            delay = DNS_WAIT_MIN_DELAY if answer != previous else min(delay * 2, DNS_WAIT_MAX_DELAY)
+            previous = answer
+            time.sleep(min(delay, deadline - now))
+
+    with ThreadPoolExecutor(max_workers=len(name_servers)) as executor:
+        visible_after = dict(zip(name_servers, executor.map(poll, name_servers)))
+
+    # anything cached before the change is now known to be stale
+    dns_answer_cache.invalidate(record_name + "." + zone["name"] if record_name != zone["name"] else zone["name"])
+
+    not_visible = dict((name_server, sorted(last_answers.get(name_server, set())))
+                       for name_server, elapsed in visible_after.items() if elapsed is None)
+    assert_that(not_visible, is_(empty()),
+                "Expected {0} for {1} {2} but name servers answered differently".format(sorted(expected),
+                                                                                       record_name, record_type))
+    return visible_after
 
 
 def parse_record(record_string):
@@ -616,6 +806,53 @@ def clear_zoneid_rsid_tuple_list(to_delete, client):
             raise
 
 
+def zone_fingerprint(client, zone_id):
+    """
+    Captures the parts of a zone that tests rely on, to detect whether it changed between runs
+    :param client: a client that can see the zone
+    :param zone_id: the id of the zone
+    :return: the fingerprint, or None if the zone does not exist
+    """
+    zone_request = client.get_zone(zone_id, status=(200, 404))
+    if type(zone_request) == str or "zone" not in zone_request:
+        return None
+
+    zone = zone_request["zone"]
+    acl_rules = []
+    for rule in zone.get("acl", {}).get("rules", []):
+        rule = dict(rule)
+        rule.pop("displayName", None)
+        acl_rules.append(json.dumps(rule, sort_keys=True))
+
+    return {
+        "name": zone["name"],
+        "email": zone["email"],
+        "status": zone["status"],
+        "adminGroupId": zone["adminGroupId"],
+        "shared": zone["shared"],
+        "acl": sorted(acl_rules)
+    }
+
+
+def group_fingerprint(client, group_id):
+    """
+    Captures the parts of a group that tests rely on, to detect whether it changed between runs
+    :param client: a client that can see the group
+    :param group_id: the id of the group
+    :return: the fingerprint, or None if the group does not exist
+    """
+    group = client.get_group(group_id, status=(200, 404))
+    if type(group) == str or "id" not in group:
+        return None
+
+    return {
+        "name": group["name"],
+        "email": group["email"],
+        "members": sorted(x["id"] for x in group["members"]),
+        "admins": sorted(x["id"] for x in group["admins"])
+    }
+
+
 def get_group_json(group_name, email="test@test.com", description="this is a description", members=[{"id": "ok"}],
                    admins=[{"id": "ok"}]):
     return {
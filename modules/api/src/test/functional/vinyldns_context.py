@@ -8,9 +8,10 @@ class VinylDNSTestContext:
     vinyldns_url: str = None
     teardown: bool = False
     enable_safety_check: bool = False
+    enable_dns_cache: bool = False
 
     @staticmethod
-    def configure(name_server_ip: str, resolver_ip: str, zone: str, key_name: str, key: str, key_algo: str, url: str, teardown: bool, enable_safety_check: bool = False) -> None:
+    def configure(name_server_ip: str, resolver_ip: str, zone: str, key_name: str, key: str, key_algo: str, url: str, teardown: bool, enable_safety_check: bool = False, enable_dns_cache: bool = False) -> None:
         VinylDNSTestContext.name_server_ip = name_server_ip
         VinylDNSTestContext.resolver_ip = resolver_ip
         VinylDNSTestContext.dns_zone_name = zone
@@ -20,3 +21,4 @@ class VinylDNSTestContext:
         VinylDNSTestContext.vinyldns_url = url
         VinylDNSTestContext.teardown = teardown
         VinylDNSTestContext.enable_safety_check = enable_safety_check
+        VinylDNSTestContext.enable_dns_cache = enable_dns_cache
@@ -1,5 +1,6 @@
 import json
 import logging
+import re
 import time
 import traceback
 from json import JSONDecodeError
@@ -19,8 +20,15 @@ __all__ = ["VinylDNSClient", "MAX_RETRIES", "RETRY_WAIT"]
 MAX_RETRIES = 40
 RETRY_WAIT = 0.05
 
+# requests that change what the name servers answer: recordset changes and batch changes
+RECORD_MUTATION_PATH = re.compile(r"/recordsets|/batchrecordchanges")
+
 
 class VinylDNSClient(object):
+    # when set, requests are recorded to or replayed from this cassette (see cassette.py)
+    cassette = None
+    # when set, the dns answer cache (see utils.py) is cleared whenever the client changes records
+    dns_cache = None
 
     def __init__(self, url, access_key, secret_key):
         self.index_url = url
@@ -62,6 +70,8 @@ class VinylDNSClient(object):
             status_forcelist=status_forcelist,
         )
         adapter = HTTPAdapter(max_retries=retry)
+        if VinylDNSClient.cassette is not None:
+            adapter = VinylDNSClient.cassette.adapter(adapter)
         session.mount("http://", adapter)
         session.mount("https://", adapter)
         return session
@@ -76,6 +86,8 @@ class VinylDNSClient(object):
             status_forcelist=status_forcelist,
         )
         adapter = HTTPAdapter(max_retries=retry, pool_connections=100, pool_maxsize=100)
+        if VinylDNSClient.cassette is not None:
+            adapter = VinylDNSClient.cassette.adapter(adapter)
         session.mount("http://", adapter)
         session.mount("https://", adapter)
         return session
@@ -114,6 +126,9 @@ class VinylDNSClient(object):
         else:
             response = self.session.request(method, url, data=signed_body, headers=signed_headers, **kwargs)
 
+        if method != "GET" and RECORD_MUTATION_PATH.search(path):
+            self.invalidate_dns_cache()
+
         if status_code is not None:
             if isinstance(status_code, Iterable):
                 assert_that(response.status_code, is_in(status_code), response.text)
@@ -753,6 +768,7 @@ class VinylDNSClient(object):
             response, data = self.make_request(url, "GET", self.headers, not_found_ok=True, status=(200, 404), **kwargs)
             retries -= 1
             time.sleep(RETRY_WAIT)
+        self.invalidate_dns_cache()
 
         return response == 404
 
@@ -813,6 +829,26 @@ class VinylDNSClient(object):
 
         assert_that(zone_request["zone"]["status"], is_("Active"))
 
+    def wait_until_zones_active(self, zone_ids):
+        """
+        Waits a period of time for several zones to become active.  Each round polls every zone that is still
+        pending, so the zones share one wait instead of being waited on one after another.
+
+        :param zone_ids: the IDs of the zones; the client must be able to see all of them
+        """
+        retries = MAX_RETRIES
+        pending = list(zone_ids)
+
+        while pending and retries > 0:
+            zone_requests = [(zone_id, self.get_zone(zone_id)) for zone_id in pending]
+            pending = [zone_id for zone_id, zone_request in zone_requests
+                       if "zone" not in zone_request or zone_request["zone"]["status"] != "Active"]
+            if pending:
+                time.sleep(RETRY_WAIT)
+                retries -= 1
+
+        assert_that(pending, is_(empty()), "Zones did not become active")
+
     def wait_until_recordset_exists(self, zone_id, record_set_id, **kwargs):
         """
         Waits a period of time for the record set creation to complete.
@@ -829,6 +865,7 @@ class VinylDNSClient(object):
             retries -= 1
             time.sleep(RETRY_WAIT)
             response, data = self.make_request(url, "GET", self.headers, not_found_ok=True, status=(200, 404), **kwargs)
+        self.invalidate_dns_cache()
 
         assert_that(response, equal_to(200), data)
         if response == 200:
@@ -861,10 +898,19 @@ class VinylDNSClient(object):
                                                       change["id"], status=(200, 404))
             if type(latest_change) != str:
                 change = latest_change
+        self.invalidate_dns_cache()
 
         assert_that(change["status"], is_(expected_status))
         return change
 
+    def invalidate_dns_cache(self):
+        """
+        Drops cached dns answers once records were changed; a change submitted through the api, or one that just
+        finished applying, can make any cached answer stale
+        """
+        if self.dns_cache is not None:
+            self.dns_cache.clear()
+
     def batch_is_completed(self, batch_change):
         return batch_change["status"] in ["Complete", "Failed", "PartialFailure"]
 
@@ -885,6 +931,7 @@ class VinylDNSClient(object):
                 change = change
             else:
                 change = latest_change
+        self.invalidate_dns_cache()
 
         assert_that(self.batch_is_completed(change), is_(True))
         return change